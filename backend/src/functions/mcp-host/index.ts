@@ -2,6 +2,7 @@ import { APIGatewayProxyEvent, APIGatewayProxyResult } from 'aws-lambda';
 import { Pool } from 'pg';
 import { MCPRequest, MCPResponse } from '../../types/mcp';
 import { ContentStrategy, Pillar, Audience, SeoKeyword } from '../../types/content-strategy';
+import { TALENT_PAGE_MAX, TALENT_SORTS, buildTalentPageQuery, decodeCursor, encodeCursor } from './talent-pages';
 
 const pool = new Pool({
   host: process.env.DB_HOST,
@@ -170,11 +171,32 @@ export const handler = async (event: APIGatewayProxyEvent): Promise<APIGatewayPr
         break;
 
       case 'listTalents':
-        const talents = await pool.query(
-          'SELECT * FROM talents LIMIT $1 OFFSET $2',
-          [mcpRequest.params.limit || 10, mcpRequest.params.offset || 0]
-        );
-        response.data = talents.rows;
+        const sort = mcpRequest.params.sort || 'score';
+        const pageSize = Math.max(1, Math.min(Number(mcpRequest.params.limit) || 10, TALENT_PAGE_MAX));
+        if (!TALENT_SORTS[sort]) {
+          response.status = 'error';
+          response.error = `sort must be one of: ${Object.keys(TALENT_SORTS).join(', ')}`;
+          break;
+        }
+        if (mcpRequest.params.offset !== undefined) {
+          response.status = 'error';
+          response.error = 'offset is not supported, pass the previous nextCursor as cursor';
+          break;
+        }
+        const after = mcpRequest.params.cursor ? decodeCursor(mcpRequest.params.cursor, sort) : null;
+        if (mcpRequest.params.cursor && !after) {
+          response.status = 'error';
+          response.error = 'cursor is invalid';
+          break;
+        }
+
+        // One row past the page tells us whether there is a next one
+        const talents = await pool.query(buildTalentPageQuery(sort, pageSize + 1, after));
+        const page = talents.rows.slice(0, pageSize);
+        response.data = {
+          talents: page,
+          nextCursor: talents.rows.length > pageSize ? encodeCursor(sort, page[page.length - 1]) : null,
+        };
         break;
 
       // Content Strategy Overview
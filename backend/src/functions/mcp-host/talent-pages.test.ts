@@ -0,0 +1,63 @@
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import { buildTalentPageQuery, decodeCursor, encodeCursor } from './talent-pages';
+
+const rawCursor = (payload: unknown) => Buffer.from(JSON.stringify(payload)).toString('base64url');
+
+test('cursors round-trip the sort key and id as pg returned them', () => {
+  const rows = [
+    ['score', { score: '4.50', id: 7 }, '4.50'],
+    ['score', { score: '0.12345678901234567890', id: '9007199254740993' }, '0.12345678901234567890'],
+    ['score', { score: null, id: 7 }, null],
+    ['programmatic_position', { programmatic_position: 3, id: 7 }, 3],
+    ['programmatic_position', { programmatic_position: null, id: 7 }, null],
+  ] as const;
+  for (const [sort, row, key] of rows) {
+    assert.deepEqual(decodeCursor(encodeCursor(sort, row), sort), { key, id: row.id });
+  }
+});
+
+test('cursors whose key or id is not of the column type are rejected', () => {
+  const payloads = [
+    ['score', { a: 1 }, 7],
+    ['score', [1, 2], 7],
+    ['score', true, 7],
+    ['score', 'ten', 7],
+    ['score', 4.5, null],
+    ['score', 4.5, 7.5],
+    ['score', 4.5, '7a'],
+    ['score', 4.5, { id: 7 }],
+    ['programmatic_position', 1.5, 7],
+    ['programmatic_position', '1.5', 7],
+    [['score'], 4.5, 7],
+    ['score', 4.5],
+    ['score', 4.5, 7, 8],
+    { 0: 'score', 1: 4.5, 2: 7 },
+  ];
+  for (const payload of payloads) {
+    const sort = Array.isArray(payload) && payload[0] === 'programmatic_position' ? 'programmatic_position' : 'score';
+    assert.equal(decodeCursor(rawCursor(payload), sort), null, JSON.stringify(payload));
+  }
+});
+
+test('malformed cursors and cursors for another sort are rejected', () => {
+  assert.equal(decodeCursor('not base64 json', 'score'), null);
+  assert.equal(decodeCursor(17, 'score'), null);
+  assert.equal(decodeCursor(encodeCursor('score', { score: '1', id: 7 }), 'programmatic_position'), null);
+  assert.equal(decodeCursor(encodeCursor('score', { score: '1', id: 7 }), 'name'), null);
+});
+
+test('a page after a scored row continues into the unscored ones', () => {
+  const query = buildTalentPageQuery('score', 11, { key: '1.5', id: 7 });
+  assert.match(query.text, /\(score, id\) < \(\$2, \$3\)/);
+  assert.match(query.text, /UNION ALL/);
+  assert.match(query.text, /score IS NULL ORDER BY/);
+  assert.deepEqual(query.values, [11, '1.5', 7]);
+});
+
+test('a page after an unscored row pages the unscored ones by id', () => {
+  const query = buildTalentPageQuery('score', 11, { key: null, id: 7 });
+  assert.match(query.text, /score IS NULL AND id < \$2/);
+  assert.doesNotMatch(query.text, /UNION ALL/);
+  assert.deepEqual(query.values, [11, 7]);
+});
@@ -0,0 +1,86 @@
+// Keyset paging for listTalents, kept apart from the handler so it can be
+// tested without a database pool
+
+// Orders listTalents can page through. Ties are broken on id in the same
+// direction, so where a page ends is one (column, id) row comparison that
+// the matching index (bastion-lambda/migrations/005) can seek to. `key` is
+// the column's type, which a cursor's key has to match.
+export const TALENT_SORTS: { [sort: string]: { column: string; descending: boolean; key: 'numeric' | 'integer' } } = {
+  score: { column: 'score', descending: true, key: 'numeric' },
+  programmatic_position: { column: 'programmatic_position', descending: false, key: 'integer' },
+};
+
+// node-postgres returns numeric and bigint columns as strings, so cursor
+// keys and ids may be either a JSON number or the string pg gave us
+const INTEGER_TEXT = /^-?\d+$/;
+const NUMERIC_TEXT = /^(-?(\d+\.?\d*|\.\d+)(e[-+]?\d+)?|NaN|-?Infinity)$/i;
+
+function isCursorValue(value: unknown, type: 'numeric' | 'integer'): boolean {
+  if (typeof value === 'number') {
+    return type === 'numeric' ? Number.isFinite(value) : Number.isSafeInteger(value);
+  }
+  return typeof value === 'string' && (type === 'numeric' ? NUMERIC_TEXT : INTEGER_TEXT).test(value);
+}
+
+export const TALENT_PAGE_MAX = 100;
+
+// Helper function to make an opaque cursor for the page after `row`
+export function encodeCursor(sort: string, row: any): string {
+  const payload = JSON.stringify([sort, row[TALENT_SORTS[sort].column], row.id]);
+  return Buffer.from(payload).toString('base64url');
+}
+
+// Helper function to read a cursor made by encodeCursor for the same sort;
+// returns null if it isn't one, including when the key or id isn't of the
+// column's type (an object or array would only fail in the query)
+export function decodeCursor(token: unknown, sort: string): { key: any; id: any } | null {
+  if (typeof token !== 'string' || !TALENT_SORTS[sort]) {
+    return null;
+  }
+  try {
+    const cursor = JSON.parse(Buffer.from(token, 'base64url').toString());
+    if (!Array.isArray(cursor) || cursor.length !== 3) {
+      return null;
+    }
+    const [cursorSort, key, id] = cursor;
+    if (cursorSort !== sort || !isCursorValue(id, 'integer')) {
+      return null;
+    }
+    if (key !== null && !isCursorValue(key, TALENT_SORTS[sort].key)) {
+      return null;
+    }
+    return { key, id };
+  } catch {
+    return null;
+  }
+}
+
+// Helper function to build the query for one page of talents, keyset
+// paginated: page N reads `limit` rows from the index like page 1, where an
+// OFFSET would read and discard every earlier row. Talents with no value
+// for the sort column come last, in a second branch of their own, since
+// `OR column IS NULL` would stop the row comparison using the index.
+export function buildTalentPageQuery(sort: string, limit: number, after: { key: any; id: any } | null) {
+  const { column, descending } = TALENT_SORTS[sort];
+  const direction = descending ? 'DESC' : 'ASC';
+  const past = descending ? '<' : '>';
+  const orderBy = `ORDER BY ${column} ${direction} NULLS LAST, id ${direction} LIMIT $1`;
+
+  if (!after) {
+    return { text: `SELECT * FROM talents ${orderBy}`, values: [limit] };
+  }
+  if (after.key === null) {
+    return {
+      text: `SELECT * FROM talents WHERE ${column} IS NULL AND id ${past} $2 ${orderBy}`,
+      values: [limit, after.id],
+    };
+  }
+  return {
+    text: `SELECT * FROM (
+      (SELECT * FROM talents WHERE (${column}, id) ${past} ($2, $3) ${orderBy})
+      UNION ALL
+      (SELECT * FROM talents WHERE ${column} IS NULL ${orderBy})
+    ) page ${orderBy}`,
+    values: [limit, after.key, after.id],
+  };
+}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare the SQL classifier with the regex check it replaced.
+
+Run from bastion-lambda with the Lambda's modules importable:
+
+    PYTHONPATH=src python bench/classifier.py
+"""
+import os
+import re
+import timeit
+
+from sql_classifier import analyze
+
+ITERATIONS = int(os.environ.get('ITERATIONS', '20000'))
+
+def legacy_is_read_only_query(sql):
+    """The per-keyword regex loop handle_sql used before the lexer."""
+    sql = sql.lower().strip()
+    if not sql.startswith('select'):
+        return False
+    dangerous_keywords = [
+        'insert', 'update', 'delete', 'drop', 'alter', 'create', 'replace',
+        'truncate', 'exec', 'execute', 'merge', 'upsert', 'call', 'grant', 'revoke'
+    ]
+    for keyword in dangerous_keywords:
+        pattern = r'\b' + keyword + r'\b'
+        if re.search(pattern, sql):
+            return False
+    return True
+
+QUERIES = {
+    'short lookup': "SELECT * FROM talents WHERE id = $1",
+    'dropdown list': "SELECT id, name FROM topics WHERE visible = true ORDER BY name",
+    'string literal': "SELECT id FROM talents WHERE note LIKE '%update%'",
+    'comment': "SELECT id FROM talents -- delete me later\nWHERE status = 'active'",
+    'cte': """
+        WITH ranked AS (
+            SELECT t.id, t.name, count(ts.skill_id) AS skill_count
+            FROM talents t
+            JOIN talent_skills ts ON ts.talent_id = t.id
+            GROUP BY t.id, t.name
+        )
+        SELECT * FROM ranked WHERE skill_count > 3 ORDER BY skill_count DESC LIMIT 50
+    """,
+    'write': "UPDATE talents SET status = 'inactive' WHERE id = 1",
+}
+
+
+def main():
+    # Where the two classifiers are expected to disagree, the lexer is right
+    print("=== Verdicts ===")
+    for label, sql in QUERIES.items():
+        print(f"{label:16} legacy={legacy_is_read_only_query(sql)!s:5} lexer={analyze(sql).read_only!s:5}")
+
+    print(f"\n=== Timings ({ITERATIONS} iterations, microseconds per call) ===")
+    print(f"{'query':16} {'legacy':>10} {'lexer cold':>12} {'lexer memo':>12}")
+    for label, sql in QUERIES.items():
+        legacy = timeit.timeit(lambda: legacy_is_read_only_query(sql), number=ITERATIONS)
+        cold = timeit.timeit(lambda: analyze.__wrapped__(sql), number=ITERATIONS)
+        warm = timeit.timeit(lambda: analyze(sql), number=ITERATIONS)
+        scale = 1e6 / ITERATIONS
+        print(f"{label:16} {legacy * scale:10.2f} {cold * scale:12.2f} {warm * scale:12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Time /talent/search facet counts against one query per facet.
+
+Run from bastion-lambda with the Lambda's modules importable:
+
+    BENCH_DSN="host=localhost dbname=bench" PYTHONPATH=src python bench/facets.py
+"""
+import os
+import time
+
+from prepared_statements import bind_params, to_pyformat
+from scratch_db import apply_migration, close, connect, create_schema, percentile, seed_tags
+from talent_search import TAG_FILTERS, build_facet_query, match_source
+
+# Everything is created in its own schema of the BENCH_DSN database
+BENCH_SCHEMA = os.environ.get('BENCH_SCHEMA', 'bench_talent_facets')
+TALENTS = int(os.environ.get('TALENTS', '1000000'))
+ITERATIONS = int(os.environ.get('ITERATIONS', '100'))
+
+# The latency the sidebar can afford for its counts, at p99
+P99_TARGET_MS = float(os.environ.get('FACET_P99_TARGET_MS', '250'))
+
+# facet -> (number of values, tags per talent)
+DIMENSIONS = {
+    'skills': (200, 5),
+    'industries': (30, 2),
+    'specialties': (40, 2),
+    'topics': (100, 3),
+    'formats': (12, 2),
+    'languages': (15, 1),
+}
+
+# Applied in order once the data is loaded, as in production
+MIGRATIONS = ('001_talent_search_indexes.sql', '004_talent_facet_indexes.sql', '005_talent_keyset_indexes.sql')
+
+# Filter sets as the sidebar sends them, from broad to narrow
+FILTERS = {
+    'one skill': {'skills': [2]},
+    'skill+language': {'skills': [2], 'languages': [3]},
+    'three filters': {'skills': [5], 'topics': [4], 'min_score': 50},
+    'narrow': {'skills': [150], 'formats': [8]},
+    'no filters': {},
+}
+
+
+def load(cursor):
+    create_schema(cursor)
+    cursor.execute(
+        "INSERT INTO talents (name, score, experience_years, completed_projects, programmatic_position) "
+        "SELECT 'Talent ' || g, round((random() * 100)::numeric, 1), g %% 20, g %% 120, g "
+        "FROM generate_series(1, %s) g",
+        (TALENTS,)
+    )
+    for field, (values, per_talent) in DIMENSIONS.items():
+        seed_tags(cursor, field, values, per_talent)
+
+
+def per_facet_queries(body):
+    """The alternative: a total plus one GROUP BY per facet, each refiltering."""
+    source, where, params = match_source(body)
+    queries = [f"SELECT count(*) FROM {source} {where}"]
+    for field in DIMENSIONS:
+        link_table, link_column, _, _ = TAG_FILTERS[field]
+        queries.append(
+            f"SELECT l.{link_column}, count(*) FROM {source} JOIN {link_table} l ON l.talent_id = t.id {where}"
+            f"GROUP BY l.{link_column} ORDER BY count(*) DESC LIMIT 50"
+        )
+    return [to_pyformat(*bind_params(sql, params)) for sql in queries]
+
+
+def match_query(body):
+    """Selecting the matches alone, which the page query has to do as well."""
+    source, where, params = match_source(body)
+    return [to_pyformat(*bind_params(f"SELECT count(*) FROM {source} {where}", params))]
+
+
+def time_queries(cursor, queries):
+    started_at = time.perf_counter()
+    for sql, params in queries:
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    return (time.perf_counter() - started_at) * 1000
+
+
+def main():
+    conn, cursor = connect(BENCH_SCHEMA)
+
+    print(f"Loading {TALENTS} talents into {BENCH_SCHEMA}...")
+    started_at = time.perf_counter()
+    load(cursor)
+    for migration in MIGRATIONS:
+        apply_migration(cursor, migration)
+    cursor.execute("ANALYZE")
+    print(f"Loaded and indexed in {time.perf_counter() - started_at:.1f}s")
+
+    print(f"\n=== Facet counts for all {len(DIMENSIONS)} facets ({ITERATIONS} iterations, ms) ===")
+    print(f"{'filters':15} {'matches':>8} {'matching p50':>13} {'single p50':>11} {'p95':>7} {'p99':>7} {'per-facet p50':>14} {'p99':>7}  target")
+    misses = 0
+    for label, body in FILTERS.items():
+        facet_sql, facet_params = build_facet_query(body, list(DIMENSIONS))
+        single = [to_pyformat(*bind_params(facet_sql, facet_params))]
+        separate = per_facet_queries(body)
+
+        cursor.execute(*single[0])
+        matches = next(row for row in cursor.fetchall() if row[0] is None)[3]
+        time_queries(cursor, single)  # warm the cache
+        single_ms = [time_queries(cursor, single) for _ in range(ITERATIONS)]
+        matching = match_query(body)
+        matching_ms = [time_queries(cursor, matching) for _ in range(max(1, ITERATIONS // 5))]
+        separate_ms = [time_queries(cursor, separate) for _ in range(max(1, ITERATIONS // 5))]
+
+        p99 = percentile(single_ms, 0.99)
+        met = p99 <= P99_TARGET_MS
+        misses += not met
+        print(f"{label:15} {matches:8d} {percentile(matching_ms, 0.5):13.1f} {percentile(single_ms, 0.5):11.1f} "
+              f"{percentile(single_ms, 0.95):7.1f} {p99:7.1f} {percentile(separate_ms, 0.5):14.1f} {percentile(separate_ms, 0.99):7.1f}  "
+              f"{'met' if met else 'MISSED'}")
+
+    print(f"\np99 target: {P99_TARGET_MS:.0f}ms, missed by {misses} of {len(FILTERS)} filter sets")
+
+    close(conn, BENCH_SCHEMA)
+
+
+if __name__ == '__main__':
+    main()
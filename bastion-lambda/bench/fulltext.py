@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Time /talent/search in substring and fulltext mode on generated talents.
+
+Run from bastion-lambda with the Lambda's modules importable:
+
+    BENCH_DSN="host=localhost dbname=bench" PYTHONPATH=src python bench/fulltext.py
+"""
+import os
+import time
+
+from prepared_statements import bind_params, to_pyformat
+from scratch_db import apply_migration, close, connect, create_schema, percentile
+from talent_search import build_search_query
+
+# Everything is created in its own schema of the BENCH_DSN database
+BENCH_SCHEMA = os.environ.get('BENCH_SCHEMA', 'bench_talent_search')
+TALENTS = int(os.environ.get('TALENTS', '1000000'))
+ITERATIONS = int(os.environ.get('ITERATIONS', '20'))
+
+# Earlier words are picked far more often than later ones, so the search
+# terms below cover both very common and uncommon matches
+WORDS = (
+    'content writer editor marketing strategy brand story research digital social '
+    'technology healthcare finance education travel food fashion sports science '
+    'video podcast blog newsletter whitepaper journalist copywriting seo saas '
+    'fintech blockchain cybersecurity sustainability biotech ecommerce gaming '
+    'robotics quantum genomics aerospace maritime'
+).split()
+
+# Only one talent in RARE_EVERY mentions this, in their bio
+RARE_WORD = 'viticulture'
+RARE_EVERY = 1000
+
+SEARCHES = {
+    'common word': 'marketing',
+    'two words': 'healthcare video',
+    'phrase': '"content strategy"',
+    'or': 'fintech or blockchain',
+    'rare word': RARE_WORD,
+}
+
+# Applied in order once the data is loaded, as in production
+MIGRATIONS = ('001_talent_search_indexes.sql', '002_talent_fulltext.sql', '005_talent_keyset_indexes.sql')
+
+# random() ^ 2 skews towards the front of the word list. Bios mix a few of
+# those words into filler drawn from a 20000-word vocabulary, so documents
+# have a realistic number of distinct lexemes. Every subquery mentions g
+# so Postgres evaluates it per row rather than once.
+LOAD_SQL = """
+CREATE TEMP TABLE words AS SELECT %(words)s::text[] AS w;
+
+INSERT INTO talents (name, headline, bio, score, experience_years, completed_projects, programmatic_position)
+SELECT 'Talent ' || g,
+       (SELECT string_agg(w[1 + floor(array_length(w, 1) * random() ^ 2)::int], ' ')
+          FROM words, generate_series(1, 4 + g %% 2)),
+       (SELECT string_agg(CASE WHEN i %% 5 = 0
+                                THEN w[1 + floor(array_length(w, 1) * random() ^ 2)::int]
+                                ELSE 'w' || floor(random() * 20000)::int END, ' ')
+          FROM words, generate_series(1, 30 + g %% 20) i)
+         || CASE WHEN g %% %(rare_every)s = 0 THEN ' ' || %(rare_word)s ELSE '' END,
+       round((random() * 100)::numeric, 1), g %% 20, g %% 120, g
+  FROM generate_series(1, %(talents)s) g;
+
+INSERT INTO clips (talent_id, title)
+SELECT t.id,
+       (SELECT string_agg(w[1 + floor(array_length(w, 1) * random() ^ 2)::int], ' ')
+          FROM words, generate_series(1, 6 + c))
+  FROM talents t, generate_series(1, 2) c
+ WHERE t.id %% 4 = 0;
+
+INSERT INTO skills (name) SELECT initcap(unnest) FROM unnest(%(words)s::text[]);
+INSERT INTO talent_skills
+SELECT t.id, 1 + (t.id * k) %% (SELECT count(*) FROM skills) FROM talents t, generate_series(1, 3) k
+ON CONFLICT DO NOTHING;
+"""
+
+
+def timed(cursor, sql, params=None):
+    started_at = time.perf_counter()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return (time.perf_counter() - started_at) * 1000, rows
+
+
+def run_search(cursor, body):
+    """Run the bastion's own /talent/search query for `body`, ITERATIONS times."""
+    sql, params, _, _ = build_search_query(body)
+    statement, values = bind_params(sql, params)
+    query, query_params = to_pyformat(statement, values)
+    timed(cursor, query, query_params)  # warm the cache
+    samples = [timed(cursor, query, query_params)[0] for _ in range(ITERATIONS)]
+    return samples
+
+
+def main():
+    conn, cursor = connect(BENCH_SCHEMA)
+    create_schema(cursor)
+
+    print(f"Loading {TALENTS} talents into {BENCH_SCHEMA}...")
+    elapsed, _ = timed(cursor, LOAD_SQL + "SELECT 1", {'words': WORDS, 'talents': TALENTS, 'rare_word': RARE_WORD, 'rare_every': RARE_EVERY})
+    cursor.execute("ANALYZE")
+    print(f"Loaded in {elapsed / 1000:.1f}s")
+
+    for migration in MIGRATIONS:
+        started_at = time.perf_counter()
+        apply_migration(cursor, migration)
+        print(f"Applied {migration} in {time.perf_counter() - started_at:.1f}s")
+
+    cursor.execute("SELECT pg_size_pretty(pg_relation_size('talents_search_vector_idx'))")
+    print(f"GIN index size: {cursor.fetchone()[0]}")
+
+    print(f"\n=== /talent/search, first page of 20 ({ITERATIONS} iterations, ms) ===")
+    print(f"{'search':14} {'matches':>9} {'substring p50':>14} {'p95':>8} {'fulltext p50':>13} {'p95':>8}")
+    for label, term in SEARCHES.items():
+        # Substring mode gets the bare words, since it has no query syntax
+        plain = term.replace('"', '').replace(' or ', ' ')
+        _, rows = timed(cursor, "SELECT count(*) FROM talents WHERE search_vector @@ websearch_to_tsquery('english', %s)", (term,))
+        substring = run_search(cursor, {'search_term': plain})
+        fulltext = run_search(cursor, {'search_term': term, 'search_mode': 'fulltext'})
+        print(f"{label:14} {rows[0][0]:9d} {percentile(substring, 0.5):14.1f} {percentile(substring, 0.95):8.1f} "
+              f"{percentile(fulltext, 0.5):13.1f} {percentile(fulltext, 0.95):8.1f}")
+
+    sql, params, _, _ = build_search_query({'search_term': SEARCHES['two words'], 'search_mode': 'fulltext'})
+    statement, values = bind_params(sql, params)
+    cursor.execute("EXPLAIN " + to_pyformat(statement, values)[0], to_pyformat(statement, values)[1])
+    print("\nFulltext plan:")
+    print('\n'.join(row[0] for row in cursor.fetchall()))
+
+    close(conn, BENCH_SCHEMA)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""A scratch schema for the benchmarks, and the migrations applied to it."""
+import os
+import sys
+
+import psycopg2
+
+from talent_search import TAG_FILTERS
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def connect(schema):
+    """Connect to BENCH_DSN and (re)create `schema` as the search path.
+
+    The schema is dropped first, so BENCH_DSN has to be given explicitly
+    rather than defaulting to whatever database libpq would pick.
+    """
+    dsn = os.environ.get('BENCH_DSN')
+    if not dsn:
+        sys.exit('BENCH_DSN must name a scratch database, e.g. BENCH_DSN="host=localhost dbname=bench"')
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {schema}")
+    cursor.execute(f"SET search_path TO {schema}, public")
+    return conn, cursor
+
+
+def create_schema(cursor):
+    """Create talents, clips and every tag table /talent/search reads, all empty.
+
+    Search results carry an array per tag dimension in TAG_FILTERS, so each
+    of those lookup and link tables has to exist even when a benchmark
+    leaves it empty.
+    """
+    cursor.execute("""
+        CREATE TABLE talents (
+            id bigserial PRIMARY KEY, name text NOT NULL, headline text, bio text,
+            avatar_url text, location text, status text DEFAULT 'active',
+            programmatic_position int, score numeric, experience_years int, completed_projects int
+        )
+    """)
+    cursor.execute("CREATE TABLE clips (id bigserial PRIMARY KEY, talent_id bigint, title text, url text, publication text)")
+    for link_table, link_column, lookup_table, label in TAG_FILTERS.values():
+        cursor.execute(f"CREATE TABLE {lookup_table} (id serial PRIMARY KEY, {label} text NOT NULL)")
+        cursor.execute(
+            f"CREATE TABLE {link_table} (talent_id bigint, {link_column} int, PRIMARY KEY (talent_id, {link_column}))"
+        )
+
+
+def seed_tags(cursor, field, values, per_talent):
+    """Fill the `field` tag tables: `values` tags, up to `per_talent` on each talent.
+
+    random() ^ 2 makes low ids common and high ids rare, like real tags.
+    """
+    link_table, link_column, lookup_table, label = TAG_FILTERS[field]
+    cursor.execute(f"INSERT INTO {lookup_table} ({label}) SELECT '{field} ' || g FROM generate_series(1, %s) g", (values,))
+    cursor.execute(
+        f"INSERT INTO {link_table} "
+        f"SELECT t.id, 1 + floor(%s * random() ^ 2)::int FROM talents t, generate_series(1, %s) "
+        "ON CONFLICT DO NOTHING",
+        (values, per_talent)
+    )
+
+
+def close(conn, schema):
+    """Drop `schema` unless KEEP_SCHEMA=true, and disconnect."""
+    if os.environ.get('KEEP_SCHEMA', 'false').lower() != 'true':
+        conn.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+    conn.close()
+
+
+def statements(path):
+    """Split a migration file into statements, keeping $$ bodies whole.
+
+    CREATE INDEX CONCURRENTLY refuses to run in a multi-statement string,
+    so each statement is sent on its own, as psql would. psql meta-commands
+    (`\\set ON_ERROR_STOP on`) are skipped.
+    """
+    current, in_body = [], False
+    with open(path) as f:
+        for line in f:
+            if line.lstrip().startswith(('--', '\\')) and not in_body:
+                continue
+            current.append(line)
+            if line.count('$$') % 2:
+                in_body = not in_body
+            if not in_body and line.rstrip().endswith(';'):
+                statement = ''.join(current).strip()
+                if statement:
+                    yield statement
+                current = []
+
+
+def apply_migration(cursor, migration):
+    """Run every statement of migrations/`migration`; any failure stops the benchmark."""
+    for statement in statements(os.path.join(MIGRATIONS, migration)):
+        cursor.execute(statement)
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
@@ -329,13 +329,19 @@ if [ "$BUILD" = true ]; then
     echo "Building and deploying..."
     if check_for_changes || [ "$FORCE" = true ]; then
         echo "Changes detected in source files or requirements, or force flag set, rebuilding..."
-        pip install -r requirements.txt
+        # Dependencies are vendored into package/, built for the Lambda runtime
+        pip install -r requirements.txt --target package/ --upgrade \
+            --platform manylinux2014_x86_64 --implementation cp --python-version 3.9 --only-binary=:all:
     else
         echo "No changes detected in source files or requirements, skipping build and deploy..."
         exit 0
     fi
 fi
 
+# The function is deployed from package/ (CodeUri), so it gets the current
+# modules from src/ on every deploy, built or not
+cp src/*.py package/
+
 # Build and deploy
 sam build \
     --template-file template.yaml \
@@ -0,0 +1,41 @@
+-- Indexes behind POST /talent/search.
+--
+-- Apply with psql against the Contently database. CONCURRENTLY keeps the
+-- tables writable while the indexes build, which means this file must not
+-- run inside a transaction (no -1 / --single-transaction).
+
+-- Stop at the first error: without pg_trgm (a contrib extension that has
+-- to be installed on the server) the trigram indexes can't be built, and
+-- psql would otherwise carry on and exit successfully.
+\set ON_ERROR_STOP on
+
+-- Trigram indexes let the search term's ILIKE '%term%' use an index
+-- instead of scanning every name, bio and skill name.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_name_trgm_idx
+    ON talents USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_bio_trgm_idx
+    ON talents USING gin (bio gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS skills_name_trgm_idx
+    ON skills USING gin (name gin_trgm_ops);
+
+-- Tag filters probe the link tables from both sides: per talent when
+-- checking a candidate, per tag when starting from the selected tags.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_skills_talent_id_skill_id_idx
+    ON talent_skills (talent_id, skill_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_skills_skill_id_talent_id_idx
+    ON talent_skills (skill_id, talent_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_industries_talent_id_industry_id_idx
+    ON talent_industries (talent_id, industry_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_industries_industry_id_talent_id_idx
+    ON talent_industries (industry_id, talent_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_specialties_talent_id_specialty_id_idx
+    ON talent_specialties (talent_id, specialty_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_specialties_specialty_id_talent_id_idx
+    ON talent_specialties (specialty_id, talent_id);
+
+-- Matches the result order, so a page is read off the index and the
+-- query stops after LIMIT + OFFSET rows instead of sorting every match.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_score_id_idx
+    ON talents (score DESC NULLS LAST, id);
@@ -0,0 +1,95 @@
+-- Full-text search over talents for POST /talent/search with
+-- "search_mode": "fulltext".
+--
+-- Apply with psql against the Contently database, outside a transaction:
+-- the backfill commits in batches and the index is built CONCURRENTLY.
+
+-- Stop at the first error: otherwise a failed function or trigger would be
+-- followed by a backfill and index that depend on it, and psql would still
+-- exit successfully.
+\set ON_ERROR_STOP on
+
+-- One document per talent: name, headline, clip titles and bio, weighted
+-- in that order so a name or headline hit outranks a passing mention.
+ALTER TABLE talents ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION talent_search_document(p_id bigint, p_name text, p_headline text, p_bio text)
+RETURNS tsvector
+LANGUAGE sql STABLE
+AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(p_headline, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(
+               (SELECT string_agg(title, ' ') FROM clips WHERE talent_id = p_id), '')), 'C')
+        || setweight(to_tsvector('english', coalesce(p_bio, '')), 'D')
+$$;
+
+-- Keep the column current as talents change...
+CREATE OR REPLACE FUNCTION talents_search_vector_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.search_vector := talent_search_document(NEW.id, NEW.name, NEW.headline, NEW.bio);
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS talents_search_vector_update ON talents;
+CREATE TRIGGER talents_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, headline, bio ON talents
+    FOR EACH ROW EXECUTE FUNCTION talents_search_vector_trigger();
+
+-- ...and as their clips do. Touching search_vector directly doesn't fire
+-- the trigger above, so the talent's document is rebuilt here.
+CREATE OR REPLACE FUNCTION clips_search_vector_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE talents
+       SET search_vector = talent_search_document(id, name, headline, bio)
+     WHERE id IN (
+         CASE WHEN TG_OP <> 'INSERT' THEN OLD.talent_id END,
+         CASE WHEN TG_OP <> 'DELETE' THEN NEW.talent_id END
+     );
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS clips_search_vector_update ON clips;
+CREATE TRIGGER clips_search_vector_update
+    AFTER INSERT OR DELETE OR UPDATE OF title, talent_id ON clips
+    FOR EACH ROW EXECUTE FUNCTION clips_search_vector_trigger();
+
+-- Each document looks up the talent's clips, so index them before the
+-- backfill; without it every row scans the whole clips table.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS clips_talent_id_idx
+    ON clips (talent_id);
+
+-- Backfill existing rows in batches, so no single transaction holds row
+-- locks on the whole table.
+DO $$
+DECLARE
+    last_id bigint := 0;
+    batch_end bigint;
+BEGIN
+    LOOP
+        SELECT max(id) INTO batch_end
+          FROM (SELECT id FROM talents WHERE id > last_id ORDER BY id LIMIT 10000) batch;
+        EXIT WHEN batch_end IS NULL;
+
+        UPDATE talents
+           SET search_vector = talent_search_document(id, name, headline, bio)
+         WHERE id > last_id AND id <= batch_end;
+
+        last_id := batch_end;
+        COMMIT;
+    END LOOP;
+END
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_search_vector_idx
+    ON talents USING gin (search_vector);
+
+ANALYZE talents;
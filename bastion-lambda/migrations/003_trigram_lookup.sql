@@ -0,0 +1,22 @@
+-- Trigram indexes behind POST /talent/lookup.
+--
+-- Apply with psql against the Contently database, outside a transaction
+-- (the indexes are built CONCURRENTLY). The skills and talents indexes
+-- already exist if 001_talent_search_indexes.sql ran; IF NOT EXISTS makes
+-- this file safe to apply either way.
+
+-- Stop at the first error: without pg_trgm (a contrib extension that has
+-- to be installed on the server) nothing below can be built, and psql
+-- would otherwise carry on and exit successfully.
+\set ON_ERROR_STOP on
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- `term <% name` (word similarity) is answered from these indexes, so a
+-- misspelt term only rechecks the few names that share its trigrams.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS skills_name_trgm_idx
+    ON skills USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS topics_name_trgm_idx
+    ON topics USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_name_trgm_idx
+    ON talents USING gin (name gin_trgm_ops);
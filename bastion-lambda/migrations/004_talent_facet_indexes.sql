@@ -0,0 +1,20 @@
+-- Indexes for the topic, format and language filters and facet counts on
+-- POST /talent/search.
+--
+-- Apply with psql against the Contently database, outside a transaction
+-- (the indexes are built CONCURRENTLY).
+
+-- As in 001: talent-first for filtering and for counting the tags of a
+-- small set of matches, tag-first for starting from the selected tags.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_topics_talent_id_topic_id_idx
+    ON talent_topics (talent_id, topic_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_topics_topic_id_talent_id_idx
+    ON talent_topics (topic_id, talent_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_story_formats_talent_id_story_format_id_idx
+    ON talent_story_formats (talent_id, story_format_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_story_formats_story_format_id_talent_id_idx
+    ON talent_story_formats (story_format_id, talent_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_languages_talent_id_language_id_idx
+    ON talent_languages (talent_id, language_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talent_languages_language_id_talent_id_idx
+    ON talent_languages (language_id, talent_id);
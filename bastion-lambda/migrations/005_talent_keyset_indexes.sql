@@ -0,0 +1,17 @@
+-- Indexes for keyset pagination on POST /talent/search.
+--
+-- Apply with psql against the Contently database, outside a transaction
+-- (the indexes are built and dropped CONCURRENTLY).
+
+-- One per sort, in the result order with id as the tie-break. The next
+-- page's (key, id) row comparison is then an index condition, and a page
+-- is read off the index wherever it starts. Talents with no value are
+-- paged by id alone, from the same index.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_score_id_desc_idx
+    ON talents (score DESC NULLS LAST, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS talents_programmatic_position_id_idx
+    ON talents (programmatic_position, id);
+
+-- Superseded by talents_score_id_desc_idx: ties on score now go by id
+-- descending, which this index can't return in order.
+DROP INDEX CONCURRENTLY IF EXISTS talents_score_id_idx;
@@ -0,0 +1,96 @@
+import os
+import gzip
+import base64
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU or the base64 overhead
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+
+# Fast settings: these bodies are compressed once, on the request path
+GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '5'))
+BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '4'))
+
+
+def supported_encodings():
+    """Content codings we can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encodings(accept_encoding):
+    """Parse an Accept-Encoding header into {coding: quality}."""
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding):
+    """Return the coding to compress with for this Accept-Encoding, or None."""
+    qualities = accepted_encodings(accept_encoding)
+    for coding in supported_encodings():
+        if qualities.get(coding, qualities.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress(data, coding):
+    if coding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if coding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f'Unsupported content coding: {coding}')
+
+
+def decompress(data, coding):
+    if coding == 'br':
+        if brotli is None:
+            raise ValueError('brotli is not installed')
+        return brotli.decompress(data)
+    if coding == 'gzip':
+        return gzip.decompress(data)
+    raise ValueError(f'Unsupported content coding: {coding}')
+
+
+def compress_response(response, accept_encoding, min_bytes=COMPRESS_MIN_BYTES):
+    """Compress a Lambda proxy response's text body in place if worthwhile.
+
+    The body is replaced by base64 of the compressed bytes with
+    `isBase64Encoded` set, which is how Lambda function URLs and API Gateway
+    carry binary bodies. Responses that are already base64, already
+    encoded, or below `min_bytes` are left alone.
+    """
+    body = response.get('body')
+    headers = response.setdefault('headers', {})
+    headers['Vary'] = 'Accept-Encoding'
+    if not isinstance(body, str) or response.get('isBase64Encoded'):
+        return response
+    if any(name.lower() == 'content-encoding' for name in headers):
+        return response
+
+    coding = choose_encoding(accept_encoding)
+    if coding is None:
+        return response
+    data = body.encode('utf-8')
+    if len(data) < min_bytes:
+        return response
+
+    response['body'] = base64.b64encode(compress(data, coding)).decode('ascii')
+    response['isBase64Encoded'] = True
+    headers['Content-Encoding'] = coding
+    return response
@@ -0,0 +1,82 @@
+import os
+import time
+import random
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the TCP/TLS handshake and for Contently's answer
+CONTENTLY_CONNECT_TIMEOUT = float(os.environ.get('CONTENTLY_CONNECT_TIMEOUT_SECONDS', '3.05'))
+CONTENTLY_READ_TIMEOUT = float(os.environ.get('CONTENTLY_READ_TIMEOUT_SECONDS', '10'))
+
+# Extra attempts when a connection can't be established, and the backoff cap
+CONTENTLY_CONNECT_RETRIES = int(os.environ.get('CONTENTLY_CONNECT_RETRIES', '2'))
+CONTENTLY_RETRY_BASE_SECONDS = float(os.environ.get('CONTENTLY_RETRY_BASE_SECONDS', '0.1'))
+CONTENTLY_RETRY_MAX_SECONDS = float(os.environ.get('CONTENTLY_RETRY_MAX_SECONDS', '1'))
+
+
+def is_connect_error(error):
+    """Whether `error` happened before the request reached Contently.
+
+    Only these are safe to retry: nothing was sent, so nothing can have
+    been processed twice. Read timeouts, resets mid-response and any HTTP
+    status (4xx included) are never retried.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+class ContentlyClient:
+    """Pooled HTTP client for calls to the Contently app.
+
+    One instance per container keeps its keep-alive connections (and so
+    their TLS sessions) across warm invocations, instead of a new handshake
+    per request. Every call has connect and read timeouts, and connect
+    failures are retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, base_url, connect_timeout=CONTENTLY_CONNECT_TIMEOUT,
+                 read_timeout=CONTENTLY_READ_TIMEOUT, connect_retries=CONTENTLY_CONNECT_RETRIES,
+                 pool_size=4):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (float(connect_timeout), float(read_timeout))
+        self.connect_retries = int(connect_retries)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.counters = {
+            'requests': 0,
+            'connect_retries': 0,
+        }
+
+    def post(self, path, **kwargs):
+        """POST to `path` under the base URL. Takes the same arguments as requests."""
+        return self.request('POST', path, **kwargs)
+
+    def request(self, method, path, **kwargs):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            self.counters['requests'] += 1
+            try:
+                return self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if attempt >= self.connect_retries or not is_connect_error(e):
+                    raise
+                delay = random.uniform(0, min(CONTENTLY_RETRY_MAX_SECONDS, CONTENTLY_RETRY_BASE_SECONDS * 2 ** attempt))
+                attempt += 1
+                self.counters['connect_retries'] += 1
+                logger.warning("Could not connect to %s (%s), retry %s in %.2fs", url, e, attempt, delay)
+                time.sleep(delay)
+
+    def stats(self):
+        return dict(self.counters)
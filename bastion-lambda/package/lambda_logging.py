@@ -0,0 +1,95 @@
+import json
+import os
+import time
+import random
+import logging
+
+# Payloads longer than this are cut down before they are logged
+LOG_PAYLOAD_MAX_BYTES = int(os.environ.get('LOG_PAYLOAD_MAX_BYTES', '2048'))
+
+# Fraction of invocations whose payloads are logged in full at DEBUG
+LOG_FULL_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_FULL_PAYLOAD_SAMPLE_RATE', '0'))
+
+
+def configure_logging(level=None):
+    """Set the root log level from LOG_LEVEL (default INFO) and return the root logger.
+
+    The Lambda runtime already attaches a handler to the root logger, so
+    only the level needs setting.
+    """
+    root = logging.getLogger()
+    root.setLevel(level or os.environ.get('LOG_LEVEL', 'INFO').upper())
+    return root
+
+
+class PayloadLogger:
+    """Logs request/response payloads without paying for what isn't written.
+
+    Nothing is formatted unless the level is enabled. Payloads above
+    `max_bytes` are truncated unless the invocation was picked for
+    full-payload logging by `sample_rate`. CPU time spent here is tallied so
+    it can be reported with the invocation's metrics.
+    """
+
+    def __init__(self, logger, max_bytes=LOG_PAYLOAD_MAX_BYTES, sample_rate=LOG_FULL_PAYLOAD_SAMPLE_RATE):
+        self.logger = logger
+        self.max_bytes = int(max_bytes)
+        self.sample_rate = float(sample_rate)
+        self.begin_invocation()
+
+    def begin_invocation(self):
+        """Reset the per-invocation tallies and roll the sampling decision."""
+        self.sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        self.cpu_seconds = 0.0
+        self.truncated = 0
+
+    def payload(self, label, payload, level=logging.DEBUG):
+        """Log a str, bytes or JSON-serializable payload under `label`."""
+        if not self.logger.isEnabledFor(level):
+            return
+        started_at = time.process_time()
+        try:
+            self.logger.log(level, "%s: %s", label, self._render(payload))
+        finally:
+            self.cpu_seconds += time.process_time() - started_at
+
+    def event(self, label, event, level=logging.DEBUG):
+        """Log a Lambda event, with its body treated as a payload."""
+        if not self.logger.isEnabledFor(level):
+            return
+        started_at = time.process_time()
+        try:
+            envelope = {key: value for key, value in event.items() if key != 'body'}
+            self.logger.log(level, "%s: %s", label, json.dumps(envelope, default=str))
+        finally:
+            self.cpu_seconds += time.process_time() - started_at
+        if event.get('body'):
+            self.payload(f"{label} body", event['body'], level)
+
+    def stats(self):
+        """Return this invocation's logging cost and behaviour."""
+        return {
+            'logging_cpu_ms': round(self.cpu_seconds * 1000, 3),
+            'logging_truncated': self.truncated,
+            'logging_sampled': self.sampled,
+        }
+
+    def _render(self, payload):
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            size = len(payload)
+            text = bytes(payload[:self._limit(size)]).decode('utf-8', errors='replace')
+        elif isinstance(payload, str):
+            size = len(payload)
+            text = payload[:self._limit(size)]
+        else:
+            text = json.dumps(payload, default=str)
+            size = len(text)
+            text = text[:self._limit(size)]
+
+        if size > self._limit(size):
+            self.truncated += 1
+            return f"{text}... [{size} total, truncated]"
+        return text
+
+    def _limit(self, size):
+        return size if self.sampled else self.max_bytes
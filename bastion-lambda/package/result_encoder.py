@@ -0,0 +1,149 @@
+import datetime
+import decimal
+import uuid
+
+# Postgres type OIDs (pg_type.oid) we convert, as reported in cursor.description
+BYTEA = 17
+CIDR = 650
+INET = 869
+DATE = 1082
+TIME = 1083
+TIMESTAMP = 1114
+TIMESTAMPTZ = 1184
+INTERVAL = 1186
+TIMETZ = 1266
+NUMERIC = 1700
+UUID = 2950
+
+# Array types map to the OID of their element type
+ARRAY_ELEMENT_TYPES = {
+    1001: BYTEA,
+    651: CIDR,
+    1041: INET,
+    1182: DATE,
+    1183: TIME,
+    1115: TIMESTAMP,
+    1185: TIMESTAMPTZ,
+    1187: INTERVAL,
+    1270: TIMETZ,
+    1231: NUMERIC,
+    2951: UUID,
+}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _bytea(value):
+    # Same text form Postgres itself uses for bytea output
+    return '\\x' + bytes(value).hex()
+
+
+def _interval(value):
+    return value.total_seconds()
+
+
+def _numeric(value):
+    """A JSON number when that is exact, otherwise the exact decimal string.
+
+    Money and high-precision values that a float would round (and NaN or
+    Infinity, which JSON can't hold) come back as strings.
+    """
+    if not value.is_finite():
+        return str(value)
+    if value == value.to_integral_value():
+        return int(value)
+    as_float = float(value)
+    if decimal.Decimal(repr(as_float)) == value:
+        return as_float
+    return str(value)
+
+
+# Per-value converters keyed by element type OID
+VALUE_CONVERTERS = {
+    BYTEA: _bytea,
+    CIDR: str,
+    INET: str,
+    DATE: _isoformat,
+    TIME: _isoformat,
+    TIMESTAMP: _isoformat,
+    TIMESTAMPTZ: _isoformat,
+    INTERVAL: _interval,
+    TIMETZ: _isoformat,
+    NUMERIC: _numeric,
+    UUID: str,
+}
+
+
+def _scalar_column(convert):
+    def convert_column(values):
+        return [None if value is None else convert(value) for value in values]
+    return convert_column
+
+
+def _array_column(convert):
+    def convert_nested(value):
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [convert_nested(item) for item in value]
+        return convert(value)
+
+    def convert_column(values):
+        return [convert_nested(value) for value in values]
+    return convert_column
+
+
+def column_converters(description):
+    """Pick a whole-column converter for each column from its type OID.
+
+    Returns a list aligned with `description`; None means the values psycopg2
+    produces for that type already encode as JSON and are left alone.
+    """
+    converters = []
+    for column in description or []:
+        oid = column[1]
+        if oid in VALUE_CONVERTERS:
+            converters.append(_scalar_column(VALUE_CONVERTERS[oid]))
+        elif oid in ARRAY_ELEMENT_TYPES:
+            converters.append(_array_column(VALUE_CONVERTERS[ARRAY_ELEMENT_TYPES[oid]]))
+        else:
+            converters.append(None)
+    return converters
+
+
+def convert_columns(columns, converters):
+    """Apply `converters` to a list of column value sequences."""
+    return [
+        values if convert is None else convert(values)
+        for values, convert in zip(columns, converters)
+    ]
+
+
+def convert_batch(rows, converters):
+    """Apply `converters` column by column to a batch of row tuples."""
+    if not rows or not any(converters):
+        return rows
+    return list(zip(*convert_columns(zip(*rows), converters)))
+
+
+def json_default(value):
+    """Fallback for json.dumps when a column's OID had no converter.
+
+    Covers custom types whose typecaster returns one of the usual Python
+    types (domains over timestamps, numerics and so on).
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return _numeric(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _bytea(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
@@ -0,0 +1,184 @@
+import io
+import json
+import time
+import logging
+from collections import namedtuple
+
+from result_encoder import column_converters, convert_batch, convert_columns, json_default
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+RESULT_FORMATS = ('rows', 'columnar')
+COLUMNAR_LAYOUTS = ('columns', 'rows')
+
+QueryResult = namedtuple('QueryResult', ['body', 'column_names', 'row_count', 'truncated', 'fetch_ms', 'serialize_ms'])
+
+
+class Batches:
+    """Iterate over a cursor's rows in fetchmany batches, up to `max_rows`.
+
+    `first_batch` lets callers pass in a batch they already fetched (named
+    cursors only populate `description` after the first fetch). After
+    iteration, `truncated` says whether rows were left behind because of
+    `max_rows`, and `fetch_seconds` how long was spent waiting on the cursor.
+    """
+
+    def __init__(self, cursor, batch_size=DEFAULT_BATCH_SIZE, first_batch=None, max_rows=None):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.first_batch = first_batch
+        self.max_rows = max_rows
+        self.truncated = False
+        self.fetch_seconds = 0.0
+
+    def __iter__(self):
+        remaining = self.max_rows
+        batch = self.first_batch
+        if batch is None:
+            batch = self._fetch(self._next_size(remaining))
+        while batch:
+            if remaining is not None:
+                if len(batch) > remaining:
+                    batch = batch[:remaining]
+                    self.truncated = True
+                remaining -= len(batch)
+            if batch:
+                yield batch
+            if self.truncated:
+                return
+            if remaining == 0:
+                # Only one more row is needed to know whether we cut anything off
+                self.truncated = bool(self._fetch(1))
+                return
+            batch = self._fetch(self._next_size(remaining))
+
+    def _fetch(self, size):
+        start = time.monotonic()
+        try:
+            return self.cursor.fetchmany(size)
+        finally:
+            self.fetch_seconds += time.monotonic() - start
+
+    def _next_size(self, remaining):
+        if remaining is None:
+            return self.batch_size
+        return max(1, min(self.batch_size, remaining))
+
+
+def write_json_results(column_names, batches, out, converters=()):
+    """Write `{"results": [...]` to `out` one batch at a time.
+
+    Only the current batch is ever held as Python dicts, so peak memory is
+    bounded by the batch size plus the encoded output. The closing brace is
+    left to the caller so it can append trailing fields.
+    """
+    row_count = 0
+    out.write('{"results": [')
+    for batch in batches:
+        batch = convert_batch(batch, converters)
+        encoded = json.dumps([dict(zip(column_names, row)) for row in batch], default=json_default)
+        if row_count:
+            out.write(', ')
+        out.write(encoded[1:-1])
+        row_count += len(batch)
+    out.write(']')
+    return row_count
+
+
+def write_columnar_results(column_names, type_oids, batches, out, layout='columns', converters=()):
+    """Write a columnar payload that names each column once.
+
+    With layout='rows' the data is a list of row arrays and is streamed
+    batch by batch. With layout='columns' the data is one array per column;
+    building those needs every row, but each value is held once rather than
+    in a tuple, a dict and a string. The closing brace is left to the caller.
+    """
+    out.write('{"format": "columnar", "layout": ')
+    out.write(json.dumps(layout))
+    out.write(', "columns": ')
+    out.write(json.dumps(column_names))
+    out.write(', "type_oids": ')
+    out.write(json.dumps(type_oids))
+    out.write(', "data": ')
+
+    row_count = 0
+    if layout == 'rows':
+        out.write('[')
+        for batch in batches:
+            batch = convert_batch(batch, converters)
+            encoded = json.dumps(batch, default=json_default)
+            if row_count:
+                out.write(', ')
+            out.write(encoded[1:-1])
+            row_count += len(batch)
+        out.write(']')
+    else:
+        columns = [[] for _ in column_names]
+        for batch in batches:
+            for values, column in zip(zip(*batch), columns):
+                column.extend(values)
+            row_count += len(batch)
+        if converters:
+            columns = convert_columns(columns, converters)
+        out.write(json.dumps(columns, default=json_default))
+
+    out.write(', "row_count": ')
+    out.write(str(row_count))
+    return row_count
+
+
+def fetch_results(cursor, batch_size=DEFAULT_BATCH_SIZE, named=False,
+                  result_format='rows', layout='columns', max_rows=None, started_at=None):
+    """Fetch up to `max_rows` rows from `cursor` and serialize them.
+
+    The body ends with `truncated` and, when `started_at` (a
+    time.monotonic() value) is given, `elapsed_ms`. Returns a QueryResult,
+    whose `fetch_ms` is time spent in the cursor and `serialize_ms` the rest.
+    """
+    serialize_started_at = time.monotonic()
+    first_batch = None
+    first_fetch_seconds = 0.0
+    if named:
+        # A server-side cursor has no description until rows are requested
+        first_batch = cursor.fetchmany(max(1, min(batch_size, max_rows or batch_size)))
+        first_fetch_seconds = time.monotonic() - serialize_started_at
+    elif cursor.description is None:
+        first_batch = []
+
+    description = cursor.description or []
+    column_names = [desc[0] for desc in description]
+    logger.debug("Column names: %s", column_names)
+
+    # Decide how to encode each column once, from its type OID
+    converters = column_converters(description)
+
+    out = io.StringIO()
+    batches = Batches(cursor, batch_size, first_batch, max_rows)
+    if result_format == 'columnar':
+        type_oids = [desc[1] for desc in description]
+        row_count = write_columnar_results(column_names, type_oids, batches, out, layout, converters)
+    else:
+        row_count = write_json_results(column_names, batches, out, converters)
+
+    out.write(', "truncated": ')
+    out.write(json.dumps(batches.truncated))
+    if started_at is not None:
+        out.write(', "elapsed_ms": ')
+        out.write(json.dumps(round((time.monotonic() - started_at) * 1000, 1)))
+    out.write('}')
+    body = out.getvalue()
+
+    fetch_ms = (first_fetch_seconds + batches.fetch_seconds) * 1000
+    serialize_ms = (time.monotonic() - serialize_started_at) * 1000 - fetch_ms
+    logger.debug("Query returned %s rows (truncated: %s)", row_count, batches.truncated)
+    return QueryResult(body, column_names, row_count, batches.truncated, fetch_ms, serialize_ms)
+
+
+def append_fields(body, fields):
+    """Add top-level `fields` to a serialized result body without re-encoding its rows."""
+    extra = json.dumps(fields, default=json_default)
+    if extra == '{}':
+        return body
+    return body[:-1] + ', ' + extra[1:]
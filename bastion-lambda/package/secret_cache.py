@@ -0,0 +1,91 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SecretCache:
+    """In-process cache for a single secret value with a TTL.
+
+    `loader` is a zero-argument callable that fetches the current value.
+    Once an entry is older than `ttl_seconds - refresh_ahead_seconds` a
+    background thread refreshes it while callers keep getting the cached
+    value; only a fully expired (or invalidated) entry blocks on the loader.
+    """
+
+    def __init__(self, loader, ttl_seconds=300, refresh_ahead_seconds=60):
+        self._loader = loader
+        self.ttl_seconds = float(ttl_seconds)
+        self.refresh_ahead_seconds = min(float(refresh_ahead_seconds), self.ttl_seconds)
+        self._value = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._generation = 0
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'background_refreshes': 0,
+            'invalidations': 0,
+        }
+
+    def get(self):
+        """Return the cached value, loading it synchronously if missing or expired."""
+        with self._lock:
+            age = self._age()
+            if age is not None and age < self.ttl_seconds:
+                self.counters['hits'] += 1
+                if age >= self.ttl_seconds - self.refresh_ahead_seconds and not self._refreshing:
+                    self._start_background_refresh()
+                return self._value
+
+        self.counters['misses'] += 1
+        value = self._loader()
+        with self._lock:
+            self._store(value)
+        return value
+
+    def invalidate(self):
+        """Drop the cached value so the next get() goes back to the source."""
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+            self._generation += 1
+            self.counters['invalidations'] += 1
+
+    def _age(self):
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def _store(self, value):
+        self._value = value
+        self._loaded_at = time.monotonic()
+
+    def _start_background_refresh(self):
+        self._refreshing = True
+        thread = threading.Thread(
+            target=self._refresh,
+            args=(self._generation,),
+            name='secret-cache-refresh',
+            daemon=True
+        )
+        thread.start()
+
+    def _refresh(self, generation):
+        try:
+            value = self._loader()
+            with self._lock:
+                # An invalidate() while we were loading means this value may
+                # already be the stale one; let the next get() reload instead.
+                if generation == self._generation:
+                    self._store(value)
+                    self.counters['background_refreshes'] += 1
+            logger.debug("Secret refreshed in the background")
+        except Exception as e:
+            # Keep serving the cached value; a synchronous load happens on expiry
+            logger.warning("Background secret refresh failed: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
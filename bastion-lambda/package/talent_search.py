@@ -0,0 +1,476 @@
+import base64
+import decimal
+import json
+import os
+import re
+
+# Page size when the request doesn't give one, and the most it may ask for
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', '100'))
+
+# How search_term is matched: a substring of name, bio or a skill, or a
+# ranked full-text query (needs migrations/002_talent_fulltext.sql)
+SEARCH_MODES = ('substring', 'fulltext')
+
+# Text search configuration the search_vector column was built with
+FULLTEXT_CONFIG = 'english'
+
+# List filters: request field -> (link table, link column, lookup table,
+# lookup column holding the name). A talent matches when it has any of the
+# given values, by id or by name. Each of these is also a facet.
+TAG_FILTERS = {
+    'skills': ('talent_skills', 'skill_id', 'skills', 'name'),
+    'industries': ('talent_industries', 'industry_id', 'industries', 'name'),
+    'specialties': ('talent_specialties', 'specialty_id', 'specialties', 'name'),
+    'topics': ('talent_topics', 'topic_id', 'topics', 'name'),
+    'formats': ('talent_story_formats', 'story_format_id', 'story_formats', 'description'),
+    'languages': ('talent_languages', 'language_id', 'languages', 'name'),
+}
+
+# Orders results can come in: sort -> (result column, SQL expression,
+# descending, nullable, key type). Ties are broken on id in the same
+# direction, so where a page ends is a single row comparison on (key, id).
+# The key type is what a cursor may hold for the key (see cursor_key).
+SORT_ORDERS = {
+    'relevance': ('rank', 'ts_rank_cd(t.search_vector, q.query, 1)', True, False, 'real'),
+    'score': ('score', 't.score', True, True, 'numeric'),
+    'programmatic_position': ('programmatic_position', 't.programmatic_position', False, True, 'integer'),
+}
+
+# Most values returned per facet, most common first
+FACET_LIMIT = int(os.environ.get('FACET_LIMIT', '50'))
+
+# Threshold filters: request field -> talents column it is a lower bound on
+MINIMUM_FILTERS = {
+    'min_experience': 'experience_years',
+    'min_score': 'score',
+    'min_projects': 'completed_projects',
+}
+
+# Columns returned for each talent on the page
+RESULT_COLUMNS = (
+    't.id', 't.name', 't.headline', 't.bio', 't.avatar_url', 't.location', 't.status',
+    't.programmatic_position', 't.score', 't.experience_years', 't.completed_projects',
+)
+
+# Fuzzy lookup (POST /talent/lookup): kind -> (table, extra condition).
+# Names are matched by pg_trgm word similarity, so a misspelt or partial
+# term still finds them (needs migrations/003_trigram_lookup.sql).
+LOOKUP_SOURCES = {
+    'skills': ('skills', None),
+    'topics': ('topics', 'x.visible = true'),
+    'talents': ('talents', None),
+}
+
+# Candidates per term and kind, the most terms per request, and the
+# statement timeout a lookup gets when it doesn't ask for less
+LOOKUP_LIMIT = int(os.environ.get('LOOKUP_LIMIT', '3'))
+LOOKUP_MAX_LIMIT = int(os.environ.get('LOOKUP_MAX_LIMIT', '10'))
+LOOKUP_MAX_TERMS = int(os.environ.get('LOOKUP_MAX_TERMS', '20'))
+LOOKUP_BUDGET_MS = int(os.environ.get('LOOKUP_BUDGET_MS', '300'))
+
+# Words in free text that are never worth looking up
+LOOKUP_MIN_TERM_LENGTH = 3
+LOOKUP_STOP_WORDS = frozenset((
+    'and', 'are', 'can', 'for', 'from', 'has', 'have', 'her', 'him', 'his', 'how',
+    'looking', 'need', 'not', 'our', 'please', 'she', 'someone', 'that', 'the',
+    'their', 'them', 'they', 'this', 'want', 'was', 'who', 'with', 'would',
+    'you', 'your',
+))
+WORD = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+
+
+class SearchError(ValueError):
+    """A search request that can't be turned into a query."""
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so `term` only ever matches literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_mode(body):
+    mode = body.get('search_mode', 'substring')
+    if mode not in SEARCH_MODES:
+        raise SearchError(f"search_mode must be one of: {', '.join(SEARCH_MODES)}")
+    return mode
+
+
+def tag_values(body, field):
+    """Return the list of ids or names given for a tag filter, or None if unset."""
+    values = body.get(field)
+    if values is None or values == []:
+        return None
+    if not isinstance(values, list):
+        raise SearchError(f'{field} must be a list')
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return values
+    if all(isinstance(v, str) for v in values):
+        return values
+    raise SearchError(f'{field} must be all ids or all names')
+
+
+def minimum_value(body, field):
+    value = body.get(field)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise SearchError(f'{field} must be a number')
+    return value
+
+
+def page_limit(body):
+    """Return the page size from the request, within the configured maximum."""
+    limit = body.get('limit', SEARCH_PAGE_SIZE)
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise SearchError('limit must be a positive integer')
+    if 'offset' in body:
+        raise SearchError("offset is not supported, pass the previous page's next_cursor as cursor")
+    return min(limit, SEARCH_MAX_PAGE_SIZE)
+
+
+def sort_order(body, mode):
+    """Return the requested sort: relevance by default for a fulltext search, score otherwise."""
+    ranked = mode == 'fulltext' and bool((body.get('search_term') or '').strip())
+    sort = body.get('sort', 'relevance' if ranked else 'score')
+    if sort not in SORT_ORDERS:
+        raise SearchError(f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    if sort == 'relevance' and not ranked:
+        raise SearchError('sort relevance needs a fulltext search_term')
+    return sort
+
+
+def encode_cursor(sort, row):
+    """Opaque token for the page after `row`: its sort, sort key and id.
+
+    Keys are taken from the serialized row, so a numeric score is a JSON
+    number, or a decimal string where a float would round it; either way
+    it round-trips exactly.
+    """
+    column = SORT_ORDERS[sort][0]
+    payload = json.dumps([sort, row[column], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Return (key, id) from a cursor made by encode_cursor for the same sort."""
+    if not isinstance(token, str):
+        raise SearchError('cursor must be a string')
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        cursor_sort, key, last_id = json.loads(payload)
+    except (ValueError, TypeError):
+        raise SearchError('cursor is invalid')
+    if not isinstance(cursor_sort, str) or cursor_sort not in SORT_ORDERS:
+        raise SearchError('cursor is invalid')
+    if cursor_sort != sort:
+        raise SearchError(f'cursor is for sort {cursor_sort}, not {sort}')
+    if isinstance(last_id, bool) or not isinstance(last_id, int):
+        raise SearchError('cursor is invalid')
+    return cursor_key(key, sort), last_id
+
+
+def cursor_key(key, sort):
+    """Return a cursor's sort key ready to bind, if it has the sort column's type.
+
+    Anything else (an object, a list, a string where a number belongs)
+    would only fail once it reached the database.
+    """
+    nullable, key_type = SORT_ORDERS[sort][3:]
+    if key is None and nullable:
+        return None
+    if isinstance(key, bool):
+        raise SearchError('cursor is invalid')
+    if isinstance(key, int) or (isinstance(key, float) and key_type != 'integer'):
+        return key
+    if isinstance(key, str) and key_type == 'numeric':
+        try:
+            value = decimal.Decimal(key)
+        except decimal.InvalidOperation:
+            raise SearchError('cursor is invalid')
+        if not value.is_snan():
+            return value
+    raise SearchError('cursor is invalid')
+
+
+def tag_array(field):
+    """ARRAY(...) of a talent's names for one tag dimension, in name order."""
+    link_table, link_column, lookup_table, label = TAG_FILTERS[field]
+    return (
+        f"ARRAY(SELECT x.{label} FROM {link_table} l JOIN {lookup_table} x ON x.id = l.{link_column} "
+        f"WHERE l.talent_id = t.id ORDER BY x.{label}) AS {field}"
+    )
+
+
+def build_filters(body, mode='substring'):
+    """Translate the filter fields of a search request into SQL conditions.
+
+    Returns (conditions, params): a list of boolean SQL fragments to AND
+    together, with `%(name)s` placeholders for every value in `params`.
+    No request value is ever interpolated into the SQL text. In fulltext
+    mode the search term is left in params['query'] for the caller to
+    join in as `q`, since ranking needs it too.
+    """
+    conditions = []
+    params = {}
+
+    search_term = body.get('search_term')
+    if search_term is not None and not isinstance(search_term, str):
+        raise SearchError('search_term must be a string')
+    if search_term and search_term.strip() and mode == 'fulltext':
+        # websearch syntax: quoted phrases, OR, and -excluded words
+        params['query'] = search_term.strip()
+        conditions.append("t.search_vector @@ q.query")
+    elif search_term and search_term.strip():
+        params['pattern'] = f'%{escape_like(search_term.strip())}%'
+        link_table, link_column, lookup_table, label = TAG_FILTERS['skills']
+        conditions.append(
+            "(t.name ILIKE %(pattern)s OR t.bio ILIKE %(pattern)s OR EXISTS ("
+            f"SELECT 1 FROM {link_table} l JOIN {lookup_table} x ON x.id = l.{link_column} "
+            f"WHERE l.talent_id = t.id AND x.{label} ILIKE %(pattern)s))"
+        )
+
+    for field, (link_table, link_column, lookup_table, label) in TAG_FILTERS.items():
+        values = tag_values(body, field)
+        if values is None:
+            continue
+        params[field] = values
+        if isinstance(values[0], int):
+            conditions.append(
+                f"EXISTS (SELECT 1 FROM {link_table} l "
+                f"WHERE l.talent_id = t.id AND l.{link_column} = ANY(%({field})s))"
+            )
+        else:
+            conditions.append(
+                f"EXISTS (SELECT 1 FROM {link_table} l JOIN {lookup_table} x ON x.id = l.{link_column} "
+                f"WHERE l.talent_id = t.id AND x.{label} = ANY(%({field})s))"
+            )
+
+    for field, column in MINIMUM_FILTERS.items():
+        value = minimum_value(body, field)
+        if value is None:
+            continue
+        params[field] = value
+        conditions.append(f"t.{column} >= %({field})s")
+
+    # Starred talents live in the browser, so the caller sends their ids
+    if body.get('starred_only'):
+        starred_ids = body.get('starred_ids') or []
+        if not isinstance(starred_ids, list) or not all(
+                isinstance(v, int) and not isinstance(v, bool) for v in starred_ids):
+            raise SearchError('starred_ids must be a list of ids')
+        params['starred_ids'] = starred_ids
+        conditions.append("t.id = ANY(%(starred_ids)s)")
+
+    return conditions, params
+
+
+def match_source(body):
+    """Return (source, where, params): the FROM and WHERE selecting the talents a request matches.
+
+    `source` aliases talents as `t`, plus the parsed full-text query as `q`
+    in fulltext mode. `where` is empty when nothing is filtered.
+    """
+    conditions, params = build_filters(body, search_mode(body))
+    source = 'talents t'
+    if 'query' in params:
+        source = f"talents t CROSS JOIN websearch_to_tsquery('{FULLTEXT_CONFIG}', %(query)s) AS q(query)"
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+    return source, where, params
+
+
+def build_search_query(body):
+    """Build one parameterized query for a /talent/search request.
+
+    The filter fields mirror the browser's filterTalentProfiles: every given
+    filter must match, list filters match on any value. Results are ordered
+    by `sort` (see SORT_ORDERS), and a fulltext search returns its ts_rank_cd
+    relevance as `rank`. Returns (sql, params, limit, sort). The query asks
+    for one row beyond the page, so the caller can tell whether another
+    page follows.
+
+    Pages are keyset paginated: a `cursor` holds the last row's sort key
+    and id, and the next page starts after it in the index order, so a
+    deep page costs the same as the first. Talents with no value for a
+    nullable key come last. They are paged in a second branch of their
+    own, since an `OR key IS NULL` would keep the row comparison from
+    being an index condition.
+    """
+    source, where, params = match_source(body)
+    limit = page_limit(body)
+    sort = sort_order(body, search_mode(body))
+    column, key, descending, nullable, _ = SORT_ORDERS[sort]
+    params['limit'] = limit + 1
+
+    columns = RESULT_COLUMNS + tuple(tag_array(field) for field in TAG_FILTERS)
+    if 'query' in params:
+        # Normalization 1 divides by log(document length), so a long bio
+        # doesn't outrank a short one just by repeating a word
+        columns += ('ts_rank_cd(t.search_vector, q.query, 1) AS rank',)
+    select = f"SELECT {', '.join(columns)} FROM {source} "
+    direction, past = ('DESC', '<') if descending else ('ASC', '>')
+    order_by = f"ORDER BY {key} {direction} NULLS LAST, t.id {direction} LIMIT %(limit)s"
+
+    if body.get('cursor') is None:
+        return f"{select}{where}{order_by}", params, limit, sort
+
+    after_key, after_id = decode_cursor(body['cursor'], sort)
+    params['after_id'] = after_id
+    and_where = f"{where}AND " if where else 'WHERE '
+    branches = []
+    if after_key is not None:
+        params['after_key'] = after_key
+        branches.append(f"{select}{and_where}({key}, t.id) {past} (%(after_key)s, %(after_id)s) {order_by}")
+    if nullable:
+        after_nulls = f" AND t.id {past} %(after_id)s" if after_key is None else ''
+        branches.append(f"{select}{and_where}{key} IS NULL{after_nulls} {order_by}")
+    if len(branches) == 1:
+        return branches[0], params, limit, sort
+
+    sql = (
+        f"SELECT * FROM (({branches[0]}) UNION ALL ({branches[1]})) page "
+        f"ORDER BY page.{column} {direction} NULLS LAST, page.id {direction} LIMIT %(limit)s"
+    )
+    return sql, params, limit, sort
+
+
+def facet_fields(body):
+    """Return the facets a search request asks for: all of them for `true`, or a list."""
+    facets = body.get('facets')
+    if not facets:
+        return []
+    if facets is True:
+        return list(TAG_FILTERS)
+    if not isinstance(facets, list) or any(f not in TAG_FILTERS for f in facets):
+        raise SearchError(f"facets must be true or a list of: {', '.join(TAG_FILTERS)}")
+    return list(dict.fromkeys(facets))
+
+
+def build_facet_query(body, facets):
+    """Build one query counting matching talents per value of each facet.
+
+    The matching talent ids are computed once, and each of them is visited
+    once: a LATERAL over every facet's link table gathers all of its tags
+    through the talent-first indexes. The tags, plus one row per talent for
+    the total, are then counted in a single GROUP BY. A separate query per
+    facet would repeat the filtering each time. With no filters at all
+    every talent matches, so the link tables are counted directly. Only the
+    top FACET_LIMIT values per facet are kept, and names are looked up for
+    those alone. Rows are (facet, id, name, count); the total has a NULL
+    facet.
+    """
+    source, where, params = match_source(body)
+    params['facet_limit'] = FACET_LIMIT
+
+    branches = []
+    names = []
+    for field in facets:
+        link_table, link_column, lookup_table, label = TAG_FILTERS[field]
+        branch = f"SELECT '{field}'::text AS facet, l.{link_column}::bigint AS id FROM {link_table} l"
+        if where:
+            branch += ' WHERE l.talent_id = m.id'
+        branches.append(branch)
+        names.append(f"WHEN '{field}' THEN (SELECT x.{label} FROM {lookup_table} x WHERE x.id = c.id)")
+
+    if where:
+        tags = "SELECT NULL::text AS facet, NULL::bigint AS id FROM matches"
+        if branches:
+            tags += f" UNION ALL SELECT l.facet, l.id FROM matches m CROSS JOIN LATERAL ({' UNION ALL '.join(branches)}) l"
+        matches = f"matches AS MATERIALIZED (SELECT t.id FROM {source} {where}), "
+    else:
+        tags = ' UNION ALL '.join(["SELECT NULL::text AS facet, NULL::bigint AS id FROM talents"] + branches)
+        matches = ''
+
+    name = f"CASE c.facet {' '.join(names)} END" if names else 'NULL'
+    sql = (
+        f"WITH {matches}tags AS ({tags}), "
+        "counts AS (SELECT facet, id, count(*) AS count, "
+        "row_number() OVER (PARTITION BY facet ORDER BY count(*) DESC, id) AS position "
+        "FROM tags GROUP BY facet, id) "
+        f"SELECT c.facet, c.id, {name}::text AS name, c.count FROM counts c "
+        "WHERE c.position <= %(facet_limit)s "
+        "ORDER BY c.facet NULLS FIRST, c.count DESC, c.id"
+    )
+    return sql, params
+
+
+def lookup_terms(body):
+    """Collect the terms to look up, from `terms` and/or the words of `text`.
+
+    Terms are lowercased and deduplicated, short words and stop words in
+    `text` are dropped, and at most LOOKUP_MAX_TERMS are kept.
+    """
+    terms = body.get('terms') or []
+    text = body.get('text') or ''
+    if not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+        raise SearchError('terms must be a list of strings')
+    if not isinstance(text, str):
+        raise SearchError('text must be a string')
+
+    candidates = [t.strip().lower() for t in terms]
+    candidates += [
+        word for word in (w.lower() for w in WORD.findall(text))
+        if len(word) >= LOOKUP_MIN_TERM_LENGTH and word not in LOOKUP_STOP_WORDS
+    ]
+    unique = list(dict.fromkeys(t for t in candidates if t))
+    return unique[:LOOKUP_MAX_TERMS]
+
+
+def lookup_branch(kind, min_similarity):
+    """Top candidates of one kind for every term, via a LATERAL join."""
+    table, condition = LOOKUP_SOURCES[kind]
+    filters = ['q.term <%% x.name']
+    if condition:
+        filters.append(condition)
+    if min_similarity is not None:
+        filters.append('word_similarity(q.term, x.name) >= %(min_similarity)s')
+    return (
+        f"SELECT q.term, '{kind}' AS kind, m.id, m.name, m.similarity "
+        "FROM unnest(%(terms)s::text[]) AS q(term) CROSS JOIN LATERAL ("
+        "SELECT x.id, x.name, word_similarity(q.term, x.name) AS similarity "
+        f"FROM {table} x WHERE {' AND '.join(filters)} "
+        "ORDER BY similarity DESC, x.name LIMIT %(limit)s) m"
+    )
+
+
+def build_lookup_query(body):
+    """Build one query resolving possibly misspelt terms to skills, topics and talents.
+
+    `q.term <% x.name` is the index-backed form of word similarity: true
+    when some run of the name is at least pg_trgm.word_similarity_threshold
+    (0.6 by default) similar to the term. `min_similarity` can only be
+    stricter than that. Returns (sql, params, terms); with no usable terms
+    there is nothing to run.
+    """
+    terms = lookup_terms(body)
+    kinds = body.get('kinds') or list(LOOKUP_SOURCES)
+    if not isinstance(kinds, list) or any(k not in LOOKUP_SOURCES for k in kinds):
+        raise SearchError(f"kinds must be a list of: {', '.join(LOOKUP_SOURCES)}")
+
+    limit = body.get('limit', LOOKUP_LIMIT)
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise SearchError('limit must be a positive integer')
+    min_similarity = body.get('min_similarity')
+    if min_similarity is not None and (
+            isinstance(min_similarity, bool) or not isinstance(min_similarity, (int, float))
+            or not 0 <= min_similarity <= 1):
+        raise SearchError('min_similarity must be a number between 0 and 1')
+
+    params = {'terms': terms, 'limit': min(limit, LOOKUP_MAX_LIMIT)}
+    if min_similarity is not None:
+        params['min_similarity'] = min_similarity
+    branches = [lookup_branch(kind, min_similarity) for kind in dict.fromkeys(kinds)]
+    sql = ' UNION ALL '.join(branches) + ' ORDER BY term, kind, similarity DESC, name'
+    return sql, params, terms
+
+
+def group_facets(rows, facets):
+    """Shape facet query rows into {'total': n, 'facets': {facet: [{id, name, count}, ...]}}."""
+    grouped = {field: [] for field in facets}
+    total = 0
+    for row in rows:
+        if row['facet'] is None:
+            total = row['count']
+        else:
+            grouped[row['facet']].append({'id': row['id'], 'name': row['name'], 'count': row['count']})
+    return {'total': total, 'facets': grouped}
@@ -0,0 +1,221 @@
+import os
+import time
+import logging
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Statements run between callers to drop anything a previous request left on
+# the session. This is DISCARD ALL minus DEALLOCATE ALL / DISCARD PLANS, so
+# server-side prepared statements and cached plans survive across requests.
+SESSION_RESET_SQL = (
+    "CLOSE ALL; "
+    "SET SESSION AUTHORIZATION DEFAULT; "
+    "RESET ALL; "
+    "UNLISTEN *; "
+    "SELECT pg_advisory_unlock_all(); "
+    "DISCARD TEMP; "
+    "DISCARD SEQUENCES"
+)
+
+
+def begin_statement(conn, read_only, use_transaction=False):
+    """Put `conn` in the right mode before running one request's statement.
+
+    Reads run in autocommit, so they finish with no open transaction and no
+    extra COMMIT round trip; connections are opened with
+    default_transaction_read_only=on, which makes each of those implicit
+    transactions read-only on the server. Reads that need a transaction
+    (server-side cursors) get BEGIN READ ONLY and writes get an explicit
+    BEGIN READ WRITE. Switching autocommit never costs a round trip as long
+    as `readonly` is left at its default, which end_statement() restores.
+    """
+    if read_only and not use_transaction:
+        conn.autocommit = True
+        return
+    conn.autocommit = False
+    conn.readonly = read_only
+
+
+def end_statement(conn, read_only, success=True):
+    """Close whatever transaction begin_statement() opened."""
+    try:
+        if conn.autocommit:
+            return
+        if success and not read_only:
+            conn.commit()
+        else:
+            # Nothing to keep from a read; this just ends the snapshot
+            conn.rollback()
+    finally:
+        if not conn.closed and not conn.autocommit:
+            conn.readonly = None
+
+
+def apply_timeouts(conn, statement_timeout_ms=None, lock_timeout_ms=None, reset=False):
+    """Override the session timeouts for the statement about to run.
+
+    Inside a transaction this uses SET LOCAL, which ends with it. In
+    autocommit there is no transaction to scope it to, so a plain SET is
+    used and the RESET ALL in release() puts the defaults back. A caller
+    running several statements per checkout passes `reset=True` once an
+    earlier one may have left a SET behind; timeouts this statement
+    doesn't give are then RESET to the session defaults.
+    """
+    verb = 'SET' if conn.autocommit else 'SET LOCAL'
+    commands = []
+    for name, value in (('statement_timeout', statement_timeout_ms), ('lock_timeout', lock_timeout_ms)):
+        if value is not None:
+            commands.append(f'{verb} {name} = {int(value)}')
+        elif reset:
+            commands.append(f'RESET {name}')
+    if not commands:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute('; '.join(commands))
+
+
+class ConnectionManager:
+    """Keeps one live database connection per warm Lambda container.
+
+    `connect` is a zero-argument callable returning a new psycopg2
+    connection. A connection that has been idle for longer than
+    `ping_after_seconds` is checked with a round trip before reuse; younger
+    connections are only checked client-side.
+    """
+
+    def __init__(self, connect, ping_after_seconds=None, max_age_seconds=None):
+        self._connect = connect
+        self.ping_after_seconds = float(
+            ping_after_seconds if ping_after_seconds is not None
+            else os.environ.get('DB_PING_AFTER_SECONDS', '30')
+        )
+        self.max_age_seconds = float(
+            max_age_seconds if max_age_seconds is not None
+            else os.environ.get('DB_MAX_CONNECTION_AGE_SECONDS', '3600')
+        )
+        self._conn = None
+        self._created_at = 0.0
+        self._last_used_at = 0.0
+        self._in_use = False
+        self.counters = {
+            'connects': 0,
+            'reuses': 0,
+            'reconnects': 0,
+            'resets': 0,
+            'discards': 0,
+        }
+
+    def acquire(self):
+        """Return a ready-to-use connection, reconnecting if the cached one is stale."""
+        if self._in_use:
+            raise RuntimeError('Connection is already checked out')
+
+        if self._conn is not None:
+            if self._is_usable(self._conn):
+                self.counters['reuses'] += 1
+                logger.debug("Reusing warm database connection")
+                self._in_use = True
+                return self._conn
+            logger.debug("Cached database connection is stale, reconnecting")
+            self._close_quietly(self._conn)
+            self._conn = None
+            self.counters['reconnects'] += 1
+
+        self._conn = self._connect()
+        self.counters['connects'] += 1
+        self._created_at = self._last_used_at = time.monotonic()
+        self._in_use = True
+        logger.debug("Database connection established")
+        return self._conn
+
+    def release(self, conn, discard=False):
+        """Hand a connection back, resetting its session for the next caller.
+
+        Pass `discard=True` when the caller saw an error that may have left
+        the connection broken; it is then closed instead of kept warm.
+        """
+        self._in_use = False
+        if conn is not self._conn:
+            self._close_quietly(conn)
+            return
+
+        if not discard:
+            try:
+                self._reset_session(conn)
+                self.counters['resets'] += 1
+            except psycopg2.Error as e:
+                logger.warning("Session reset failed, discarding connection: %s", e)
+                discard = True
+
+        if discard or conn.closed:
+            self.counters['discards'] += 1
+            self._close_quietly(conn)
+            self._conn = None
+            return
+
+        self._last_used_at = time.monotonic()
+
+    def close(self):
+        """Close the cached connection, if any."""
+        if self._conn is not None:
+            self._close_quietly(self._conn)
+            self._conn = None
+        self._in_use = False
+
+    def stats(self):
+        """Return the reuse/reconnect counters for this container."""
+        return dict(self.counters)
+
+    def _is_usable(self, conn):
+        if conn.closed:
+            return False
+
+        now = time.monotonic()
+        if now - self._created_at > self.max_age_seconds:
+            logger.debug("Database connection exceeded its max age")
+            return False
+
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+
+        if now - self._last_used_at < self.ping_after_seconds:
+            return True
+
+        # The container may have been frozen long enough for RDS or a NAT to
+        # drop the socket, so pay one round trip before trusting it.
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.debug("Database connection ping failed: %s", e)
+            return False
+
+    @staticmethod
+    def _reset_session(conn):
+        if conn.closed:
+            return
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        if not conn.autocommit:
+            conn.readonly = None
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(SESSION_RESET_SQL)
+        finally:
+            conn.autocommit = autocommit
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception as e:
+            logger.debug("Ignoring error while closing connection: %s", e)
@@ -1,36 +1,52 @@
 import json
 import os
-import re
 import psycopg2
 import boto3
-import requests
 import socket
-import logging
-import sys
+import time
 
-# Set up logging
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+from connection_manager import ConnectionManager, apply_timeouts, begin_statement, end_statement
+from secret_cache import SecretCache
+from prepared_statements import PreparedStatementCache, bind_params, to_pyformat
+from sql_classifier import analyze as analyze_sql
+from result_writer import COLUMNAR_LAYOUTS, RESULT_FORMATS, append_fields, fetch_results
+from phase_timings import PhaseTimings
+from lambda_logging import PayloadLogger, configure_logging
+from compression import compress_response
+from contently_client import ContentlyClient
+from talent_search import (
+    LOOKUP_BUDGET_MS, build_facet_query, build_lookup_query, build_search_query, encode_cursor, facet_fields,
+    group_facets
+)
 
-# Add a handler that prints to stdout for debugging
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+# Set up logging; LOG_LEVEL gates everything, including payload dumps
+logger = configure_logging()
+payload_logger = PayloadLogger(logger)
 
-def get_db_password():
-    logger.debug("Starting get_db_password function")
-    session = boto3.session.Session()
-    client = session.client('secretsmanager')
+# Phase spans for the invocation in progress; reset by lambda_handler
+timings = PhaseTimings()
+
+# Built once per container; boto3 client construction is not free
+_secretsmanager_client = None
+
+def get_secretsmanager_client():
+    global _secretsmanager_client
+    if _secretsmanager_client is None:
+        session = boto3.session.Session()
+        _secretsmanager_client = session.client('secretsmanager')
+    return _secretsmanager_client
+
+def load_db_password():
+    logger.debug("Starting load_db_password function")
+    client = get_secretsmanager_client()
     
     # Get the secret name from environment variable
     secret_id = os.environ.get('SECRET_NAME', 'contently/database/credentials')
-    logger.debug(f"Using secret ID: {secret_id}")
+    logger.debug("Using secret ID: %s", secret_id)
     
     # Determine which password key to use based on environment
     environment = os.environ.get('ENVIRONMENT', 'staging').lower()
-    logger.debug(f"Environment: {environment}")
+    logger.debug("Environment: %s", environment)
     
     # Map environment to password key in the secret
     if environment == 'poc':
@@ -41,40 +57,40 @@ def get_db_password():
         # Default to staging
         password_key = 'staging_password'
     
-    logger.debug(f"Using password key: {password_key}")
+    logger.debug("Using password key: %s", password_key)
     
     try:
-        logger.debug(f"Retrieving secret from {secret_id} with key {password_key}")
+        logger.debug("Retrieving secret from %s with key %s", secret_id, password_key)
         response = client.get_secret_value(
             SecretId=secret_id
         )
         secret = json.loads(response['SecretString'])
-        logger.debug(f"Secret keys available: {list(secret.keys())}")
+        logger.debug("Secret keys available: %s", list(secret.keys()))
         
         # Try to get the environment-specific password first
         if password_key in secret:
-            logger.debug(f"Found {password_key} in secret")
+            logger.debug("Found %s in secret", password_key)
             return secret[password_key]
         # Fall back to staging_password if the environment-specific key is not found
         elif 'staging_password' in secret:
-            logger.debug(f"Environment-specific key {password_key} not found, using staging_password")
+            logger.debug("Environment-specific key %s not found, using staging_password", password_key)
             return secret['staging_password']
         # If all else fails, use the first key in the secret
         else:
             first_key = list(secret.keys())[0]
-            logger.debug(f"No matching password key found, using first key: {first_key}")
+            logger.debug("No matching password key found, using first key: %s", first_key)
             return secret[first_key]
     except Exception as e:
-        logger.error(f"Error getting secret: {str(e)}")
+        logger.error("Error getting secret: %s", e)
         # Try to get the secret from the default location if the environment-specific one fails
         if secret_id != 'contently/database/credentials':
-            logger.debug(f"Trying fallback secret: contently/database/credentials")
+            logger.debug("Trying fallback secret: contently/database/credentials")
             try:
                 response = client.get_secret_value(
                     SecretId='contently/database/credentials'
                 )
                 secret = json.loads(response['SecretString'])
-                logger.debug(f"Fallback secret keys available: {list(secret.keys())}")
+                logger.debug("Fallback secret keys available: %s", list(secret.keys()))
                 
                 if 'staging_password' in secret:
                     return secret['staging_password']
@@ -82,193 +98,624 @@ def get_db_password():
                     first_key = list(secret.keys())[0]
                     return secret[first_key]
             except Exception as fallback_error:
-                logger.error(f"Error getting fallback secret: {str(fallback_error)}")
+                logger.error("Error getting fallback secret: %s", fallback_error)
         raise
 
-def is_read_only_query(sql):
-    logger.debug(f"Checking if query is read-only: {sql}")
-    # Convert to lowercase for easier matching
-    sql = sql.lower().strip()
+# Server-enforced limits; requests may ask for lower values, never higher
+STATEMENT_TIMEOUT_MS = int(os.environ.get('STATEMENT_TIMEOUT_MS', '25000'))
+LOCK_TIMEOUT_MS = int(os.environ.get('LOCK_TIMEOUT_MS', '5000'))
+MAX_ROWS = int(os.environ.get('MAX_ROWS', '50000'))
+
+# Session defaults sent in the startup packet, so they cost no round trips
+# and RESET ALL between callers returns to them. Every transaction is
+# read-only unless a write explicitly begins READ WRITE, and the timeouts
+# keep running on the server even after Lambda gives up on the request.
+SESSION_OPTIONS = (
+    '-c default_transaction_read_only=on '
+    f'-c statement_timeout={STATEMENT_TIMEOUT_MS} '
+    f'-c lock_timeout={LOCK_TIMEOUT_MS}'
+)
+
+# SQLSTATEs for statement_timeout/cancel and lock_timeout
+LIMIT_EXCEEDED_CODES = ('57014', '55P03')
+
+# SQLSTATE for a missing operator or function (undefined_function). The
+# lookup query only calls pg_trgm's, so there it means the extension is missing
+UNDEFINED_FUNCTION_CODE = '42883'
+
+# SQLSTATEs for a rejected login (invalid_password, invalid_authorization_specification)
+AUTH_FAILURE_CODES = ('28P01', '28000')
+
+db_password_cache = SecretCache(
+    load_db_password,
+    ttl_seconds=os.environ.get('DB_SECRET_TTL_SECONDS', '300'),
+    refresh_ahead_seconds=os.environ.get('DB_SECRET_REFRESH_AHEAD_SECONDS', '60')
+)
+
+def get_db_password():
+    return db_password_cache.get()
+
+def is_auth_failure(error):
+    """Whether a failed connect was the server rejecting our credentials.
+
+    libpq reports connection failures without a SQLSTATE, so the message
+    is checked as well.
+    """
+    return getattr(error, 'pgcode', None) in AUTH_FAILURE_CODES or 'authentication failed' in str(error)
+
+def connect_to_database():
+    db_host = os.environ.get('DB_HOST')
+    db_name = os.environ.get('DB_NAME')
+    db_user = os.environ.get('DB_USER')
+    with timings.phase('secret'):
+        db_password = get_db_password()
     
-    # Check if query starts with SELECT
-    if not sql.startswith('select'):
-        logger.debug("Query is not read-only")
-        return False
+    logger.debug("Connecting to database: host=%s, dbname=%s, user=%s", db_host, db_name, db_user)
+    try:
+        with timings.phase('connect'):
+            return psycopg2.connect(
+                host=db_host,
+                dbname=db_name,
+                user=db_user,
+                password=db_password,
+                connect_timeout=10,
+                options=SESSION_OPTIONS
+            )
+    except psycopg2.OperationalError as e:
+        # The cached password may have been rotated; retry once with a fresh
+        # one, but only if Secrets Manager actually hands back something new.
+        # Outages, timeouts and full connection slots aren't fixed by a new
+        # password, so they don't cost a Secrets Manager call.
+        if not is_auth_failure(e):
+            raise
+        logger.warning("Database connection failed, refreshing cached password: %s", e)
+        db_password_cache.invalidate()
+        with timings.phase('secret'):
+            fresh_password = get_db_password()
+        if fresh_password == db_password:
+            raise
+        logger.debug("Database password changed, retrying connection")
+        with timings.phase('connect'):
+            return psycopg2.connect(
+                host=db_host,
+                dbname=db_name,
+                user=db_user,
+                password=fresh_password,
+                connect_timeout=10,
+                options=SESSION_OPTIONS
+            )
+
+def log_connection_diagnostics(db_host):
+    # Try to get more information about the connection error
+    try:
+        logger.debug("Attempting to resolve hostname: %s", db_host)
+        ip_address = socket.gethostbyname(db_host)
+        logger.debug("Hostname resolved to IP: %s", ip_address)
         
-    # List of dangerous keywords that might modify data
-    dangerous_keywords = [
-        'insert',
-        'update',
-        'delete',
-        'drop',
-        'alter',
-        'create',
-        'replace',
-        'truncate',
-        'exec',
-        'execute',
-        'merge',
-        'upsert',
-        'call',
-        'grant',
-        'revoke'
-    ]
+        logger.debug("Attempting to connect to port 5432 on %s", ip_address)
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(5)
+        result = s.connect_ex((ip_address, 5432))
+        if result == 0:
+            logger.debug("Port 5432 is open")
+        else:
+            logger.debug("Port 5432 is closed, error code: %s", result)
+        s.close()
+    except Exception as socket_error:
+        logger.error("Error during socket test: %s", socket_error)
+
+# Rows fetched per round trip when serializing results
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '1000'))
+
+# Whether requests that don't say otherwise use a server-side cursor
+STREAM_RESULTS_DEFAULT = os.environ.get('STREAM_RESULTS', 'false').lower() == 'true'
+
+# Prepared statements for parameterized requests on the warm connection
+statement_cache = PreparedStatementCache(os.environ.get('PREPARED_STATEMENT_CACHE_SIZE', '100'))
+
+# One connection per warm container, shared by every invocation it serves
+connection_manager = ConnectionManager(connect_to_database)
+
+def is_read_only_query(sql):
+    analysis = analyze_sql(sql)
+    if analysis.read_only:
+        logger.debug("Query is read-only")
+    else:
+        logger.debug("Query is not read-only: %s", analysis.reason)
+    return analysis.read_only
+
+def parse_limit(body, key, ceiling):
+    """Read an optional positive integer limit from the request body.
+
+    Returns None when the request doesn't lower the configured ceiling.
+    """
+    value = body.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f'{key} must be a positive integer')
+    return value if value < ceiling else None
+
+class RequestError(Exception):
+    """A request (or one statement in a batch) that can't be run as given."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Fields a batch passes down to each of its statements unless overridden
+STATEMENT_OPTIONS = ('format', 'layout', 'statement_timeout_ms', 'lock_timeout_ms', 'max_rows')
+
+# Most statements accepted in one /sql/batch request
+BATCH_MAX_STATEMENTS = int(os.environ.get('BATCH_MAX_STATEMENTS', '20'))
+
+def parse_request_body(event):
+    if 'body' not in event:
+        logger.error("No body in request")
+        raise RequestError(400, 'No body in request')
+    try:
+        return json.loads(event['body'])
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        raise RequestError(400, 'Invalid JSON in request body')
+
+def prepare_statement(body):
+    """Validate one statement's request fields and classify it.
+
+    Returns a dict describing how to run it; raises RequestError for
+    anything the caller has to fix, including writes in read-only mode.
+    """
+    # Get SQL query
+    if 'sql' not in body:
+        logger.error("No SQL query in request body")
+        raise RequestError(400, 'No SQL query in request body')
     
-    # Check if any dangerous keywords appear in the query
-    for keyword in dangerous_keywords:
-        # Match whole words only
-        pattern = r'\b' + keyword + r'\b'
-        if re.search(pattern, sql):
-            logger.debug(f"Query contains keyword {keyword}, not read-only")
-            return False
-            
-    logger.debug("Query is read-only")
-    return True
+    sql = body['sql']
+    payload_logger.payload("SQL query", sql)
+    
+    # Bind params, if any, to Postgres $n placeholders
+    params = body.get('params')
+    statement = values = None
+    if params is not None:
+        try:
+            statement, values = bind_params(sql, params)
+        except ValueError as e:
+            logger.error("Invalid params: %s", e)
+            raise RequestError(400, f'Invalid params: {str(e)}')
+        # Parameterized statements are prepared, and PREPARE takes only one
+        if analyze_sql(sql).statement_count > 1:
+            logger.error("Parameterized SQL with more than one statement")
+            raise RequestError(400, 'SQL with params must be a single statement')
+    
+    # Get response format
+    result_format = body.get('format', 'rows')
+    layout = body.get('layout', 'columns')
+    if result_format not in RESULT_FORMATS or layout not in COLUMNAR_LAYOUTS:
+        logger.error("Unsupported result format: %s/%s", result_format, layout)
+        raise RequestError(400, f'Unsupported result format: {result_format}/{layout}')
+    
+    # Get per-request limits
+    try:
+        statement_timeout_ms = parse_limit(body, 'statement_timeout_ms', STATEMENT_TIMEOUT_MS)
+        lock_timeout_ms = parse_limit(body, 'lock_timeout_ms', LOCK_TIMEOUT_MS)
+        max_rows = parse_limit(body, 'max_rows', MAX_ROWS)
+    except ValueError as e:
+        logger.error("Invalid limit: %s", e)
+        raise RequestError(400, f'Invalid limit: {str(e)}')
+    
+    # Classify the statement once; the verdict drives the gate, the
+    # cursor choice and commit/rollback below
+    read_only_query = is_read_only_query(sql)
+    
+    # Check if read-only mode is enabled
+    read_only = os.environ.get('READ_ONLY', 'true').lower() == 'true'
+    logger.debug("Read-only mode: %s", read_only)
+    
+    # If read-only mode is enabled, check if the query is read-only
+    if read_only and not read_only_query:
+        logger.error("Write operation not allowed in read-only mode")
+        raise RequestError(403, 'Write operation not allowed in read-only mode')
+    
+    return {
+        'sql': sql,
+        'statement': statement,
+        'values': values,
+        'result_format': result_format,
+        'layout': layout,
+        'statement_timeout_ms': statement_timeout_ms,
+        'lock_timeout_ms': lock_timeout_ms,
+        'max_rows': max_rows or MAX_ROWS,
+        # A client-side cursor already holds every row when execute()
+        # returns, so a lowered cap only saves the fetch on a server-side one
+        'server_side': max_rows is not None and read_only_query,
+        'read_only_query': read_only_query,
+    }
+
+def run_statement(conn, spec, stream=False, reset_timeouts=False):
+    """Run one prepared statement spec on `conn` and serialize its rows.
+
+    Returns a QueryResult. On failure the statement's transaction (if any)
+    is rolled back before the exception propagates. `reset_timeouts` puts
+    timeouts the spec doesn't set back to the defaults first (see
+    apply_timeouts). Streamed reads, and reads with a lowered `max_rows`,
+    go through a server-side cursor, so no more rows than are returned
+    are fetched.
+    """
+    read_only_query = spec['read_only_query']
+    statement, values = spec['statement'], spec['values']
+    server_side = stream or spec['server_side']
+    started_at = time.monotonic()
+    try:
+        logger.debug("Executing query")
+        with timings.phase('execute'):
+            # Reads run in autocommit (a server-side cursor needs BEGIN READ
+            # ONLY); writes get a short explicit READ WRITE transaction
+            begin_statement(conn, read_only_query, use_transaction=server_side)
+            apply_timeouts(conn, spec['statement_timeout_ms'], spec['lock_timeout_ms'], reset=reset_timeouts)
+            if server_side:
+                cursor = conn.cursor(name='bastion_stream')
+                cursor.itersize = STREAM_BATCH_SIZE
+                if statement is None:
+                    cursor.execute(spec['sql'])
+                else:
+                    # DECLARE ... CURSOR can't wrap EXECUTE, so bind client-side
+                    cursor.execute(*to_pyformat(statement, values))
+            else:
+                cursor = conn.cursor()
+                if statement is None:
+                    cursor.execute(spec['sql'])
+                else:
+                    statement_cache.execute(conn, cursor, statement, values)
+                    logger.info("Prepared statement cache: %s", statement_cache.stats())
+        
+        # Serialize straight into the response body, one batch at a time
+        result = fetch_results(
+            cursor,
+            batch_size=STREAM_BATCH_SIZE,
+            named=server_side,
+            result_format=spec['result_format'],
+            layout=spec['layout'],
+            max_rows=spec['max_rows'],
+            started_at=started_at
+        )
+        timings.add('fetch', result.fetch_ms)
+        timings.add('serialize', result.serialize_ms)
+        
+        # Close cursor, then commit writes or end the read snapshot
+        with timings.phase('commit'):
+            cursor.close()
+            end_statement(conn, read_only_query)
+        return result
+    except Exception as e:
+        logger.error("Error executing query: %s", e)
+        # Rollback whatever the statement left open
+        try:
+            logger.debug("Rolling back transaction")
+            end_statement(conn, read_only_query, success=False)
+        except psycopg2.Error as rollback_error:
+            logger.error("Error rolling back transaction: %s", rollback_error)
+        raise
+
+def connection_is_broken(e):
+    """Whether a statement error may have left the connection unusable.
+
+    Errors that carry a SQLSTATE came from a live server.
+    """
+    return isinstance(e, psycopg2.InterfaceError) or (
+        isinstance(e, psycopg2.OperationalError) and not getattr(e, 'pgcode', None)
+    )
+
+def statement_error(e, started_at):
+    """Map a statement failure to (status code, error body dict)."""
+    if getattr(e, 'pgcode', None) in LIMIT_EXCEEDED_CODES:
+        return 504, {
+            'error': f'Query exceeded its time limit: {str(e)}',
+            'elapsed_ms': round((time.monotonic() - started_at) * 1000, 1)
+        }
+    return 500, {'error': f'Error executing query: {str(e)}'}
+
+def acquire_connection():
+    """Check out the warm connection, or raise RequestError(500)."""
+    try:
+        with timings.phase('acquire'):
+            return connection_manager.acquire()
+    except Exception as e:
+        logger.error("Error connecting to database: %s", e)
+        log_connection_diagnostics(os.environ.get('DB_HOST'))
+        raise RequestError(500, f'Error connecting to database: {str(e)}')
+
+def release_connection(conn, discard=False):
+    # A broken connection must not be handed to the next request
+    with timings.phase('release'):
+        connection_manager.release(conn, discard=discard)
+    logger.info("Database connection released: %s", connection_manager.stats())
 
 def handle_sql(event):
     logger.debug("Starting handle_sql function")
     try:
-        # Get request body
-        if 'body' not in event:
-            logger.error("No body in request")
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'No body in request'})
-            }
+        body = parse_request_body(event)
+        spec = prepare_statement(body)
         
-        # Parse request body
+        # Get a connection, reusing the warm one when it is still healthy
+        conn = acquire_connection()
+        
+        # Server-side cursors only work for statements that return rows
+        stream = body.get('stream', STREAM_RESULTS_DEFAULT) and spec['read_only_query']
+        logger.debug("Streaming results: %s", stream)
+        
+        # Execute query
+        started_at = time.monotonic()
         try:
-            body = json.loads(event['body'])
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON in request body")
+            result = run_statement(conn, spec, stream=stream)
+        except Exception as e:
+            release_connection(conn, discard=connection_is_broken(e))
+            status_code, error = statement_error(e, started_at)
             return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'Invalid JSON in request body'})
+                'statusCode': status_code,
+                'body': json.dumps(error)
             }
         
-        # Get SQL query
-        if 'sql' not in body:
-            logger.error("No SQL query in request body")
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'No SQL query in request body'})
-            }
+        # Hand the connection back for the next request
+        release_connection(conn)
+        timings.set('row_count', result.row_count)
         
-        sql = body['sql']
-        logger.debug(f"SQL query: {sql}")
+        return {
+            'statusCode': 200,
+            'body': result.body
+        }
+    except RequestError as e:
+        return {
+            'statusCode': e.status_code,
+            'body': json.dumps({'error': str(e)})
+        }
+    except Exception as e:
+        logger.error("Unexpected error in handle_sql: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Unexpected error: {str(e)}'})
+        }
+
+def handle_sql_batch(event):
+    """Run several statements on one connection in one invocation.
+
+    Each statement is validated and gated on its own, and gets its own
+    result or error in the response; one failing doesn't stop the rest
+    unless it broke the connection. Statements run one after another:
+    a psycopg2 connection can only execute one statement at a time.
+    """
+    logger.debug("Starting handle_sql_batch function")
+    try:
+        body = parse_request_body(event)
+        statements = body.get('statements') if isinstance(body, dict) else None
+        if not isinstance(statements, list) or not statements:
+            logger.error("No statements in request body")
+            raise RequestError(400, 'No statements in request body')
+        if len(statements) > BATCH_MAX_STATEMENTS:
+            logger.error("Too many statements in batch: %s", len(statements))
+            raise RequestError(400, f'Too many statements in batch (max {BATCH_MAX_STATEMENTS})')
         
-        # Check if read-only mode is enabled
-        read_only = os.environ.get('READ_ONLY', 'true').lower() == 'true'
-        logger.debug(f"Read-only mode: {read_only}")
+        # Validate everything up front, so a bad statement costs no round trip
+        defaults = {key: body[key] for key in STATEMENT_OPTIONS if key in body}
+        specs = []
+        for item in statements:
+            try:
+                if not isinstance(item, dict):
+                    raise RequestError(400, 'Each statement must be an object')
+                specs.append(prepare_statement(dict(defaults, **item)))
+            except RequestError as e:
+                specs.append(e)
         
-        # If read-only mode is enabled, check if the query is read-only
-        if read_only and not is_read_only_query(sql):
-            logger.error("Write operation not allowed in read-only mode")
-            return {
-                'statusCode': 403,
-                'body': json.dumps({'error': 'Write operation not allowed in read-only mode'})
-            }
+        conn = None
+        if any(isinstance(spec, dict) for spec in specs):
+            conn = acquire_connection()
         
-        # Connect to database
-        db_host = os.environ.get('DB_HOST')
-        db_name = os.environ.get('DB_NAME')
-        db_user = os.environ.get('DB_USER')
-        db_password = get_db_password()
+        entries = []
+        row_count = 0
+        broken = None
+        # A timeout SET in autocommit outlives its statement, so once one
+        # has been set, later statements put the ones they don't set back
+        timeouts_set = False
+        for spec in specs:
+            if isinstance(spec, RequestError):
+                entries.append(json.dumps({'status': spec.status_code, 'error': str(spec)}))
+                continue
+            if broken is not None:
+                entries.append(json.dumps({'status': 500, 'error': f'Not run, connection lost: {str(broken)}'}))
+                continue
+            
+            started_at = time.monotonic()
+            reset_timeouts = timeouts_set
+            timeouts_set = timeouts_set or spec['statement_timeout_ms'] is not None or spec['lock_timeout_ms'] is not None
+            try:
+                result = run_statement(conn, spec, reset_timeouts=reset_timeouts)
+            except Exception as e:
+                if connection_is_broken(e):
+                    broken = e
+                status_code, error = statement_error(e, started_at)
+                entries.append(json.dumps(dict(status=status_code, **error)))
+                continue
+            row_count += result.row_count
+            entries.append(result.body)
         
-        logger.debug(f"Connecting to database: host={db_host}, dbname={db_name}, user={db_user}")
+        if conn is not None:
+            release_connection(conn, discard=broken is not None)
+        timings.set('row_count', row_count)
         
+        return {
+            'statusCode': 200,
+            'body': '{"statements": [' + ', '.join(entries) + ']}'
+        }
+    except RequestError as e:
+        return {
+            'statusCode': e.status_code,
+            'body': json.dumps({'error': str(e)})
+        }
+    except Exception as e:
+        logger.error("Unexpected error in handle_sql_batch: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Unexpected error: {str(e)}'})
+        }
+
+class StatementFailed(Exception):
+    """A query the bastion built itself failed; carries the error response and SQLSTATE."""
+
+    def __init__(self, status_code, error, pgcode=None):
+        super().__init__(error['error'])
+        self.status_code = status_code
+        self.error = error
+        self.pgcode = pgcode
+
+def run_built_query(sql, params, max_rows, statement_timeout_ms=None):
+    """Run a read-only query built by the bastion (not caller SQL).
+
+    `sql` uses `%(name)s` placeholders for `params`, and is prepared like
+    any parameterized /sql statement. Returns a QueryResult; raises
+    StatementFailed with the mapped status if the statement fails.
+    """
+    statement, values = bind_params(sql, params)
+    payload_logger.payload("Built query", statement)
+    spec = {
+        'sql': sql,
+        'statement': statement,
+        'values': values,
+        'result_format': 'rows',
+        'layout': 'columns',
+        'statement_timeout_ms': statement_timeout_ms,
+        'lock_timeout_ms': None,
+        'max_rows': max_rows,
+        # Built queries carry their own LIMIT
+        'server_side': False,
+        'read_only_query': True,
+    }
+    
+    conn = acquire_connection()
+    started_at = time.monotonic()
+    try:
+        result = run_statement(conn, spec)
+    except Exception as e:
+        release_connection(conn, discard=connection_is_broken(e))
+        raise StatementFailed(*statement_error(e, started_at), getattr(e, 'pgcode', None))
+    
+    release_connection(conn)
+    timings.set('row_count', result.row_count)
+    return result
+
+def handle_talent_search(event):
+    logger.debug("Starting handle_talent_search function")
+    try:
+        body = parse_request_body(event)
+        if not isinstance(body, dict):
+            raise RequestError(400, 'Request body must be an object')
         try:
-            conn = psycopg2.connect(
-                host=db_host,
-                dbname=db_name,
-                user=db_user,
-                password=db_password,
-                connect_timeout=10
-            )
-            logger.debug("Database connection established")
-        except Exception as e:
-            logger.error(f"Error connecting to database: {str(e)}")
-            # Try to get more information about the connection error
-            try:
-                logger.debug(f"Attempting to resolve hostname: {db_host}")
-                ip_address = socket.gethostbyname(db_host)
-                logger.debug(f"Hostname resolved to IP: {ip_address}")
-                
-                logger.debug(f"Attempting to connect to port 5432 on {ip_address}")
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(5)
-                result = s.connect_ex((ip_address, 5432))
-                if result == 0:
-                    logger.debug("Port 5432 is open")
-                else:
-                    logger.debug(f"Port 5432 is closed, error code: {result}")
-                s.close()
-            except Exception as socket_error:
-                logger.error(f"Error during socket test: {str(socket_error)}")
-                
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'error': f'Error connecting to database: {str(e)}'})
-            }
+            sql, params, limit, sort = build_search_query(body)
+            facets = facet_fields(body)
+            statement_timeout_ms = parse_limit(body, 'statement_timeout_ms', STATEMENT_TIMEOUT_MS)
+        except ValueError as e:
+            logger.error("Invalid search request: %s", e)
+            raise RequestError(400, f'Invalid search request: {str(e)}')
         
-        # Execute query
+        # The query fetches one row past the page; max_rows cuts it off and
+        # `truncated` tells us whether there is a next page
+        result = run_built_query(sql, params, limit, statement_timeout_ms)
+        
+        # The next page starts after this page's last row
+        next_cursor = None
+        if result.truncated:
+            next_cursor = encode_cursor(sort, json.loads(result.body)['results'][-1])
+        page = {
+            'limit': limit,
+            'sort': sort,
+            'has_more': result.truncated,
+            'next_cursor': next_cursor,
+        }
+        extra = {'page': page}
+        
+        # Counts for the filter sidebar, all facets in one more statement
+        if facets:
+            facet_sql, facet_params = build_facet_query(body, facets)
+            facet_result = run_built_query(facet_sql, facet_params, None, statement_timeout_ms)
+            extra.update(group_facets(json.loads(facet_result.body)['results'], facets))
+        
+        return {
+            'statusCode': 200,
+            'body': append_fields(result.body, extra)
+        }
+    except StatementFailed as e:
+        return {
+            'statusCode': e.status_code,
+            'body': json.dumps(e.error)
+        }
+    except RequestError as e:
+        return {
+            'statusCode': e.status_code,
+            'body': json.dumps({'error': str(e)})
+        }
+    except Exception as e:
+        logger.error("Unexpected error in handle_talent_search: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Unexpected error: {str(e)}'})
+        }
+
+def handle_talent_lookup(event):
+    logger.debug("Starting handle_talent_lookup function")
+    try:
+        body = parse_request_body(event)
+        if not isinstance(body, dict):
+            raise RequestError(400, 'Request body must be an object')
         try:
-            logger.debug("Executing query")
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            
-            # Get column names
-            column_names = [desc[0] for desc in cursor.description] if cursor.description else []
-            logger.debug(f"Column names: {column_names}")
-            
-            # Get results
-            results = cursor.fetchall()
-            logger.debug(f"Query returned {len(results)} rows")
-            
-            # Commit if not read-only
-            if not is_read_only_query(sql):
-                logger.debug("Committing transaction")
-                conn.commit()
-            
-            # Close cursor and connection
-            cursor.close()
-            conn.close()
-            logger.debug("Database connection closed")
-            
-            # Format results
-            formatted_results = []
-            for row in results:
-                formatted_row = {}
-                for i, column_name in enumerate(column_names):
-                    formatted_row[column_name] = row[i]
-                formatted_results.append(formatted_row)
-            
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'results': formatted_results})
-            }
-        except Exception as e:
-            logger.error(f"Error executing query: {str(e)}")
-            # Rollback if not read-only
-            if not is_read_only_query(sql):
-                logger.debug("Rolling back transaction")
-                conn.rollback()
-            
-            # Close connection
-            conn.close()
-            logger.debug("Database connection closed")
-            
+            sql, params, terms = build_lookup_query(body)
+            budget_ms = parse_limit(body, 'budget_ms', LOOKUP_BUDGET_MS) or LOOKUP_BUDGET_MS
+        except ValueError as e:
+            logger.error("Invalid lookup request: %s", e)
+            raise RequestError(400, f'Invalid lookup request: {str(e)}')
+        
+        if not terms:
+            result_body = json.dumps({'results': [], 'truncated': False})
+        else:
+            # The budget is the statement timeout: a lookup that can't answer
+            # in time fails fast with a 504 instead of holding up the chat
+            result_body = run_built_query(sql, params, None, budget_ms).body
+        return {
+            'statusCode': 200,
+            'body': append_fields(result_body, {'terms': terms})
+        }
+    except StatementFailed as e:
+        if e.pgcode == UNDEFINED_FUNCTION_CODE:
+            logger.error("Lookup needs the pg_trgm extension: %s", e)
             return {
-                'statusCode': 500,
-                'body': json.dumps({'error': f'Error executing query: {str(e)}'})
+                'statusCode': 503,
+                'body': json.dumps({
+                    'error': 'Lookup is unavailable: the pg_trgm extension is not installed '
+                             '(apply migrations/003_trigram_lookup.sql)'
+                })
             }
+        return {
+            'statusCode': e.status_code,
+            'body': json.dumps(e.error)
+        }
+    except RequestError as e:
+        return {
+            'statusCode': e.status_code,
+            'body': json.dumps({'error': str(e)})
+        }
     except Exception as e:
-        logger.error(f"Unexpected error in handle_sql: {str(e)}")
+        logger.error("Unexpected error in handle_talent_lookup: %s", e)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': f'Unexpected error: {str(e)}'})
         }
 
+# Built on first use, since CONTENTLY_URL is only needed by /auth
+_contently_client = None
+
+def get_contently_client():
+    global _contently_client
+    if _contently_client is None:
+        _contently_client = ContentlyClient(os.environ['CONTENTLY_URL'])
+    return _contently_client
+
 def handle_auth(event):
     logger.debug("Starting handle_auth function")
     try:
@@ -284,9 +731,8 @@ def handle_auth(event):
                 'body': json.dumps({'error': 'Missing username or password'})
             }
         
-        # Make request to Contently auth endpoint
-        auth_url = f"{os.environ['CONTENTLY_URL']}/oauth/token"
-        response = requests.post(auth_url, json={
+        # Make request to Contently auth endpoint over the warm session
+        response = get_contently_client().post('/oauth/token', json={
             'grant_type': 'password',
             'username': username,
             'password': password
@@ -299,38 +745,80 @@ def handle_auth(event):
                 'body': response.text
             }
         else:
-            logger.error(f"Auth request failed with status code {response.status_code}")
+            logger.error("Auth request failed with status code %s", response.status_code)
             return {
                 'statusCode': response.status_code,
                 'body': response.text
             }
             
     except Exception as e:
-        logger.error(f"Error in handle_auth: {str(e)}")
+        logger.error("Error in handle_auth: %s", e)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
 
 def lambda_handler(event, context):
+    timings.reset()
+    payload_logger.begin_invocation()
+    
     # BREATHING TEST - FIRST LINE OF EXECUTION
     print("BREATHING TEST: Lambda function started")
     logger.debug("BREATHING TEST DEBUG: Lambda function started")
     
     # Log the event structure
-    print(f"Event structure: {json.dumps(event)}")
-    logger.debug(f"Event structure: {json.dumps(event)}")
+    payload_logger.event("Event structure", event)
     
     path = event.get('rawPath', '') or f"/{event.get('path', '').lstrip('/')}"
-    print(f"Path: {path}")
-    logger.debug(f"Path: {path}")
+    logger.info("Path: %s", path)
     
     if path == '/auth':
-        return handle_auth(event)
+        response = handle_auth(event)
     elif path == '/sql':
-        return handle_sql(event)
+        response = handle_sql(event)
+    elif path == '/sql/batch':
+        response = handle_sql_batch(event)
+    elif path == '/talent/search':
+        response = handle_talent_search(event)
+    elif path == '/talent/lookup':
+        response = handle_talent_lookup(event)
     else:
-        return {
+        response = {
             'statusCode': 404,
             'body': json.dumps({'error': 'Not found'})
         }
+    
+    # Bodies are json.dumps output, which escapes non-ASCII, so the string
+    # length is the byte count without encoding a copy of the body
+    timings.set('response_bytes', len(response.get('body') or ''))
+    
+    # Compress large bodies for callers that accept it
+    with timings.phase('compress'):
+        response = compress_response(response, get_header(event, 'accept-encoding'))
+    
+    return report_timings(path, response)
+
+def get_header(event, name):
+    """Look up a request header; function URLs lowercase names, but be lenient."""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def report_timings(path, response):
+    """Emit this invocation's phase timings and attach them to the response."""
+    total_ms = timings.total_ms()
+    
+    logging_stats = payload_logger.stats()
+    timings.set('logging_cpu_ms', logging_stats['logging_cpu_ms'])
+    timings.set('logging_truncated', logging_stats['logging_truncated'])
+    
+    route = path if path in ('/auth', '/sql', '/sql/batch', '/talent/search', '/talent/lookup') else 'other'
+    properties = {
+        'StatusCode': response.get('statusCode'),
+        'LoggingSampled': logging_stats['logging_sampled'],
+    }
+    timings.emit({'Route': route}, properties, total_ms=total_ms)
+    
+    response.setdefault('headers', {})['Server-Timing'] = timings.server_timing(total_ms)
+    return response
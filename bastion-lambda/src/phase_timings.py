@@ -0,0 +1,89 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TalentFinder/Bastion')
+
+# CloudWatch units for the non-timing values an invocation may record
+VALUE_UNITS = {
+    'row_count': 'Count',
+    'response_bytes': 'Bytes',
+    'logging_cpu_ms': 'Milliseconds',
+    'logging_truncated': 'Count',
+}
+
+
+class PhaseTimings:
+    """Wall-clock spans for the phases of one invocation.
+
+    Phases that run more than once (e.g. several fetches) accumulate. The
+    result is reported twice: as a Server-Timing header for whoever made the
+    request, and as one CloudWatch Embedded Metric Format line on stdout,
+    which CloudWatch turns into per-phase metrics without any API calls.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start timing a new invocation."""
+        self.started_at = time.monotonic()
+        self.phases = {}
+        self.values = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, (time.monotonic() - start) * 1000)
+
+    def add(self, name, elapsed_ms):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed_ms
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def total_ms(self):
+        return (time.monotonic() - self.started_at) * 1000
+
+    def server_timing(self, total_ms=None):
+        """Format the phases as a Server-Timing header value."""
+        total_ms = self.total_ms() if total_ms is None else total_ms
+        entries = [f'{name};dur={elapsed_ms:.1f}' for name, elapsed_ms in self.phases.items()]
+        entries.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(entries)
+
+    def emf_record(self, dimensions, properties=None, total_ms=None):
+        """Build the EMF document for this invocation.
+
+        `dimensions` should stay low-cardinality (route, not SQL text);
+        `properties` are logged alongside but don't become metrics.
+        """
+        total_ms = self.total_ms() if total_ms is None else total_ms
+        metrics = [{'Name': f'{name}_ms', 'Unit': 'Milliseconds'} for name in self.phases]
+        metrics.append({'Name': 'total_ms', 'Unit': 'Milliseconds'})
+        metrics.extend({'Name': name, 'Unit': VALUE_UNITS.get(name, 'None')} for name in self.values)
+
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': metrics,
+                }],
+            },
+        }
+        record.update(properties or {})
+        record.update(dimensions)
+        record.update({f'{name}_ms': round(elapsed_ms, 2) for name, elapsed_ms in self.phases.items()})
+        record['total_ms'] = round(total_ms, 2)
+        record.update(self.values)
+        return record
+
+    def emit(self, dimensions, properties=None, total_ms=None):
+        """Write the EMF line to stdout, where the Lambda agent picks it up."""
+        print(json.dumps(self.emf_record(dimensions, properties, total_ms)), flush=True)
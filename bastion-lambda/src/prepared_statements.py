@@ -0,0 +1,123 @@
+import re
+import logging
+import itertools
+from collections import OrderedDict
+
+from sql_classifier import analyze
+
+logger = logging.getLogger(__name__)
+
+NUMBERED_PLACEHOLDER = re.compile(r'\$(\d+)')
+NAMED_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+def bind_params(sql, params):
+    """Normalize a statement and its params to Postgres `$n` placeholders.
+
+    A list/tuple binds to `$1`, `$2`, ... in the statement. A dict binds to
+    psycopg2-style `%(name)s` placeholders, which are rewritten to `$n` in
+    order of first appearance (and `%%` back to a literal `%`, as psycopg2
+    would). Returns (statement, values). A list must have exactly as many
+    values as the highest `$n` the statement references.
+    """
+    if isinstance(params, (list, tuple)):
+        highest = max((int(n) for n in NUMBERED_PLACEHOLDER.findall(sql)), default=0)
+        if highest > len(params):
+            raise ValueError(f'Statement references ${highest} but only {len(params)} params were given')
+        if highest < len(params):
+            raise ValueError(f'{len(params)} params were given but the statement only references ${highest}')
+        return sql, list(params)
+
+    if isinstance(params, dict):
+        positions = {}
+        values = []
+
+        def number(match):
+            name = match.group(1)
+            if name not in positions:
+                if name not in params:
+                    raise ValueError(f'Missing value for named param: {name}')
+                values.append(params[name])
+                positions[name] = len(values)
+            return f'${positions[name]}'
+
+        return NAMED_PLACEHOLDER.sub(number, sql).replace('%%', '%'), values
+
+    raise ValueError('params must be a list or an object')
+
+
+def to_pyformat(statement, values):
+    """Turn a `$n` statement into psycopg2 client-side binding form.
+
+    Used where a prepared statement cannot be, e.g. DECLARE ... CURSOR for a
+    server-side cursor.
+    """
+    escaped = statement.replace('%', '%%')
+    return (
+        NUMBERED_PLACEHOLDER.sub(lambda m: f'%(p{m.group(1)})s', escaped),
+        {f'p{i}': value for i, value in enumerate(values, start=1)}
+    )
+
+
+class PreparedStatementCache:
+    """LRU of server-side prepared statements for one connection.
+
+    Statements are keyed by their text. When the connection changes (the
+    connection manager reconnected) the cache starts over, since prepared
+    statements only live as long as the session that created them.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = int(capacity)
+        self._statements = OrderedDict()
+        self._conn = None
+        self._names = itertools.count(1)
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def execute(self, conn, cursor, statement, values):
+        """PREPARE `statement` if this connection hasn't yet, then EXECUTE it.
+
+        Raises ValueError for more than one statement: PREPARE takes a
+        single one, and the rest of the text would run as it is sent.
+        """
+        if analyze(statement).statement_count > 1:
+            raise ValueError('Only a single statement can be prepared')
+        if conn is not self._conn:
+            self._statements.clear()
+            self._conn = conn
+
+        name = self._statements.get(statement)
+        if name is None:
+            self.counters['misses'] += 1
+            if self.capacity > 0 and len(self._statements) >= self.capacity:
+                self._evict(cursor)
+            name = f'bastion_stmt_{next(self._names)}'
+            logger.debug("Preparing statement %s", name)
+            cursor.execute(f'PREPARE {name} AS {statement}')
+            self._statements[statement] = name
+        else:
+            self.counters['hits'] += 1
+            self._statements.move_to_end(statement)
+
+        # A failing EXECUTE leaves the statement prepared: PREPARE is not
+        # undone by a rollback, so the entry stays and is DEALLOCATEd on
+        # eviction like any other.
+        if values:
+            placeholders = ', '.join(['%s'] * len(values))
+            cursor.execute(f'EXECUTE {name} ({placeholders})', values)
+        else:
+            cursor.execute(f'EXECUTE {name}')
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        return dict(self.counters, size=len(self._statements))
+
+    def _evict(self, cursor):
+        statement, name = self._statements.popitem(last=False)
+        self.counters['evictions'] += 1
+        logger.debug("Deallocating least recently used statement %s", name)
+        cursor.execute(f'DEALLOCATE {name}')
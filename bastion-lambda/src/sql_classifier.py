@@ -0,0 +1,227 @@
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Token kinds produced by tokenize()
+WORD = 'word'
+QUOTED_IDENT = 'quoted_ident'
+STRING = 'string'
+NUMBER = 'number'
+PARAM = 'param'
+PUNCT = 'punct'
+
+# Statements we accept as reads, by their first keyword
+READ_ONLY_LEADERS = frozenset(['select', 'with', 'values', 'table'])
+
+# Keywords that mean a statement may modify data or the schema. A word only
+# counts as a keyword here when it isn't a function call (`replace(...)`) or
+# a qualified name (`t.update`).
+DANGEROUS_KEYWORDS = frozenset([
+    'insert',
+    'update',
+    'delete',
+    'drop',
+    'alter',
+    'create',
+    'replace',
+    'truncate',
+    'exec',
+    'execute',
+    'merge',
+    'upsert',
+    'call',
+    'grant',
+    'revoke',
+    'into',
+    'copy',
+    'lock',
+])
+
+SqlAnalysis = namedtuple('SqlAnalysis', ['read_only', 'fingerprint', 'statement_count', 'reason'])
+
+_IDENT_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+_IDENT_CHARS = _IDENT_START | frozenset('0123456789$')
+_DIGITS = frozenset('0123456789')
+_STRING_PREFIXES = frozenset(['e', 'b', 'x', 'n'])
+
+
+def tokenize(sql):
+    """Split `sql` into (kind, text) tokens in a single pass.
+
+    Comments (including nested block comments) and whitespace are dropped.
+    String literals, E'' strings, dollar-quoted bodies and quoted
+    identifiers each come back as one token, so keywords inside them are
+    never mistaken for SQL.
+    """
+    i = 0
+    n = len(sql)
+    while i < n:
+        c = sql[i]
+
+        if c.isspace():
+            i += 1
+            continue
+
+        if c == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end + 1
+            continue
+
+        if c == '/' and sql.startswith('/*', i):
+            depth = 1
+            i += 2
+            while i < n and depth:
+                if sql.startswith('/*', i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith('*/', i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+            continue
+
+        if c == "'":
+            end = _scan_quoted(sql, i, "'")
+            yield STRING, sql[i:end]
+            i = end
+            continue
+
+        if c == '"':
+            end = _scan_quoted(sql, i, '"')
+            yield QUOTED_IDENT, sql[i:end]
+            i = end
+            continue
+
+        if c == '$':
+            j = i + 1
+            if j < n and sql[j] in _DIGITS:
+                while j < n and sql[j] in _DIGITS:
+                    j += 1
+                yield PARAM, sql[i:j]
+                i = j
+                continue
+            while j < n and sql[j] in _IDENT_CHARS and sql[j] != '$':
+                j += 1
+            if j < n and sql[j] == '$':
+                tag = sql[i:j + 1]
+                end = sql.find(tag, j + 1)
+                end = n if end == -1 else end + len(tag)
+                yield STRING, sql[i:end]
+                i = end
+                continue
+            yield PUNCT, c
+            i += 1
+            continue
+
+        if c in _IDENT_START:
+            j = i + 1
+            while j < n and sql[j] in _IDENT_CHARS:
+                j += 1
+            word = sql[i:j]
+            if j < n and sql[j] == "'" and word.lower() in _STRING_PREFIXES:
+                end = _scan_quoted(sql, j, "'", backslash=word.lower() == 'e')
+                yield STRING, sql[i:end]
+                i = end
+                continue
+            yield WORD, word.lower()
+            i = j
+            continue
+
+        if c in _DIGITS or (c == '.' and i + 1 < n and sql[i + 1] in _DIGITS):
+            j = i + 1
+            while j < n and (sql[j] in _DIGITS or sql[j] in '.eE' or
+                             (sql[j] in '+-' and sql[j - 1] in 'eE')):
+                j += 1
+            yield NUMBER, sql[i:j]
+            i = j
+            continue
+
+        yield PUNCT, c
+        i += 1
+
+
+def _scan_quoted(sql, start, quote, backslash=False):
+    """Return the index just past the literal that opens at `start`."""
+    i = start + 1
+    n = len(sql)
+    while i < n:
+        c = sql[i]
+        if backslash and c == '\\':
+            i += 2
+            continue
+        if c == quote:
+            if i + 1 < n and sql[i + 1] == quote:
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return n
+
+
+@lru_cache(maxsize=1024)
+def analyze(sql):
+    """Lex `sql` once and decide whether every statement in it is a read.
+
+    The result is memoized on the statement text, so repeated lookups of
+    the same query skip lexing entirely. `fingerprint` is the statement with
+    comments and whitespace normalized and literals replaced by `?`, which
+    groups queries that differ only in layout or literal values.
+    """
+    statements = [[]]
+    fingerprint = []
+    for kind, text in tokenize(sql):
+        if kind == PUNCT and text == ';':
+            if statements[-1]:
+                statements.append([])
+            continue
+        statements[-1].append((kind, text))
+        fingerprint.append('?' if kind in (STRING, NUMBER) else text)
+    if not statements[-1]:
+        statements.pop()
+
+    read_only, reason = True, None
+    if not statements:
+        read_only, reason = False, 'empty statement'
+    for tokens in statements:
+        reason = _write_reason(tokens)
+        if reason:
+            read_only = False
+            break
+
+    return SqlAnalysis(read_only, ' '.join(fingerprint), len(statements), reason)
+
+
+def _write_reason(tokens):
+    """Return why one statement's tokens are not a read, or None if they are."""
+    leader = next((text for kind, text in tokens if kind != PUNCT or text != '('), None)
+    if leader not in READ_ONLY_LEADERS:
+        return f'starts with {leader!r}'
+
+    last = len(tokens) - 1
+    for i, (kind, text) in enumerate(tokens):
+        if kind != WORD or text not in DANGEROUS_KEYWORDS:
+            continue
+        if i < last and tokens[i + 1] == (PUNCT, '('):
+            continue
+        if i > 0 and tokens[i - 1] == (PUNCT, '.'):
+            continue
+        return f'contains keyword {text!r}'
+    return None
+
+
+@lru_cache(maxsize=1024)
+def normalize(sql):
+    """Return `sql` with comments and whitespace normalized and keywords lowercased.
+
+    Unlike the fingerprint, literals are kept, so two statements with the
+    same normalized form return the same rows.
+    """
+    return ' '.join(text for _, text in tokenize(sql))
+
+
+def is_read_only(sql):
+    """Return True if `sql` only reads data."""
+    return analyze(sql).read_only
@@ -0,0 +1,47 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC)
+
+# A scratch Postgres for the tests that need one, e.g. "host=localhost dbname=bastion_test"
+TEST_DATABASE_DSN = os.environ.get('TEST_DATABASE_DSN')
+
+
+@pytest.fixture
+def conn():
+    if not TEST_DATABASE_DSN:
+        pytest.skip('TEST_DATABASE_DSN is not set')
+    psycopg2 = pytest.importorskip('psycopg2')
+    connection = psycopg2.connect(TEST_DATABASE_DSN)
+    connection.autocommit = True
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def bastion_handler(conn):
+    """Load the bastion's handler module, connected to the test database.
+
+    Returns a function taking extra libpq `options` (a search_path, say)
+    on top of the handler's own session options. Loaded by path, since the
+    proxy's handler module has the same name.
+    """
+    psycopg2 = pytest.importorskip('psycopg2')
+    loaded = []
+
+    def load(options=''):
+        spec = importlib.util.spec_from_file_location('bastion_handler', os.path.join(SRC, 'handler.py'))
+        handler = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(handler)
+        handler.connection_manager = handler.ConnectionManager(
+            lambda: psycopg2.connect(TEST_DATABASE_DSN, options=f'{handler.SESSION_OPTIONS} {options}'))
+        loaded.append(handler)
+        return handler
+
+    yield load
+    for handler in loaded:
+        handler.connection_manager.close()
@@ -0,0 +1,76 @@
+import pytest
+
+from prepared_statements import PreparedStatementCache, bind_params
+
+
+def prepared_names(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM pg_prepared_statements WHERE name LIKE 'bastion_stmt_%'")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def cached_names(cache):
+    return set(cache._statements.values())
+
+
+def test_failed_execute_keeps_the_statement_cached(conn):
+    import psycopg2
+
+    cache = PreparedStatementCache(capacity=10)
+    with conn.cursor() as cursor:
+        with pytest.raises(psycopg2.errors.DivisionByZero):
+            cache.execute(conn, cursor, 'SELECT 1 / $1::int', [0])
+        assert prepared_names(conn) == cached_names(cache)
+
+        cache.execute(conn, cursor, 'SELECT 1 / $1::int', [1])
+        assert cursor.fetchall() == [(1,)]
+
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}
+    assert prepared_names(conn) == cached_names(cache)
+
+
+def test_failed_execute_in_a_rolled_back_transaction(conn):
+    import psycopg2
+
+    cache = PreparedStatementCache(capacity=10)
+    conn.autocommit = False
+    with conn.cursor() as cursor:
+        with pytest.raises(psycopg2.errors.DivisionByZero):
+            cache.execute(conn, cursor, 'SELECT 1 / $1::int', [0])
+    conn.rollback()
+    conn.autocommit = True
+
+    assert cache.stats()['size'] == 1
+    assert prepared_names(conn) == cached_names(cache)
+
+
+def test_eviction_deallocates_failed_statements(conn):
+    import psycopg2
+
+    cache = PreparedStatementCache(capacity=1)
+    with conn.cursor() as cursor:
+        with pytest.raises(psycopg2.errors.DivisionByZero):
+            cache.execute(conn, cursor, 'SELECT 1 / $1::int', [0])
+        cache.execute(conn, cursor, 'SELECT 2', [])
+
+    assert cache.stats() == {'hits': 0, 'misses': 2, 'evictions': 1, 'size': 1}
+    assert prepared_names(conn) == cached_names(cache)
+
+
+@pytest.mark.parametrize('params', [[1], [1, 2, 3]])
+def test_list_params_must_match_the_placeholders(params):
+    with pytest.raises(ValueError):
+        bind_params('SELECT $1::int + $2::int', params)
+
+
+def test_list_params_without_placeholders_are_rejected():
+    with pytest.raises(ValueError):
+        bind_params('SELECT 1', [1])
+    assert bind_params('SELECT 1', []) == ('SELECT 1', [])
+
+
+def test_multiple_statements_are_not_prepared():
+    cache = PreparedStatementCache(capacity=10)
+    with pytest.raises(ValueError):
+        cache.execute(None, None, 'SELECT $1::int; DROP TABLE talents', [1])
+    assert cache.stats()['misses'] == 0
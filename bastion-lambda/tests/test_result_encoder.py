@@ -0,0 +1,33 @@
+import decimal
+import json
+
+import pytest
+
+from result_encoder import NUMERIC, column_converters, convert_batch, json_default
+
+D = decimal.Decimal
+
+
+@pytest.mark.parametrize('value,encoded', [
+    (D('42'), 42),
+    (D('42.000'), 42),
+    (D('-7'), -7),
+    (D('87.3'), 87.3),
+    (D('0.1'), 0.1),
+    (D('12345678901234567890'), 12345678901234567890),
+    (D('1234567890123.456789'), '1234567890123.456789'),
+    (D('0.10000000000000000001'), '0.10000000000000000001'),
+    (D('NaN'), 'NaN'),
+    (D('Infinity'), 'Infinity'),
+])
+def test_numeric_is_exact(value, encoded):
+    converted = convert_batch([(value,)], column_converters([('n', NUMERIC)]))[0][0]
+    assert converted == encoded
+    assert type(converted) is type(encoded)
+    assert json_default(value) == encoded
+
+
+def test_numeric_round_trips_through_json():
+    value = D('9999999999999999.99')
+    converted = convert_batch([(value,)], column_converters([('n', NUMERIC)]))[0][0]
+    assert D(str(json.loads(json.dumps(converted)))) == value
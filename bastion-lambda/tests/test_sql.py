@@ -0,0 +1,45 @@
+import json
+
+# Fails on its sixth row, so it only succeeds if no more than five rows are fetched
+FAILS_AFTER_FIVE_ROWS = 'SELECT 10 / (6 - g) AS n FROM generate_series(1, 10) g'
+
+
+def run_sql(handler, **body):
+    response = handler.handle_sql({'body': json.dumps(body)})
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_max_rows_stops_the_fetch(bastion_handler):
+    handler = bastion_handler()
+    status, body = run_sql(handler, sql=FAILS_AFTER_FIVE_ROWS, max_rows=3)
+    assert status == 200
+    assert [row['n'] for row in body['results']] == [2, 2, 3]
+    assert body['truncated'] is True
+
+
+def test_max_rows_stops_the_fetch_of_a_parameterized_statement(bastion_handler):
+    handler = bastion_handler()
+    status, body = run_sql(handler, sql=FAILS_AFTER_FIVE_ROWS.replace('6', '$1::int'), params=[6], max_rows=3)
+    assert status == 200
+    assert len(body['results']) == 3
+    assert body['truncated'] is True
+
+
+def test_without_max_rows_the_whole_result_is_fetched(bastion_handler):
+    handler = bastion_handler()
+    status, body = run_sql(handler, sql=FAILS_AFTER_FIVE_ROWS)
+    assert status == 500
+    assert 'division by zero' in body['error']
+
+
+def test_parameterized_sql_must_be_a_single_statement(bastion_handler):
+    handler = bastion_handler()
+    status, body = run_sql(handler, sql='SELECT $1::int; SELECT 2', params=[1])
+    assert status == 400
+
+
+def test_extra_params_are_a_400(bastion_handler):
+    handler = bastion_handler()
+    status, body = run_sql(handler, sql='SELECT 1', params=[1])
+    assert status == 400
+    assert body['error'].startswith('Invalid params')
@@ -0,0 +1,26 @@
+import json
+
+
+def run_batch(handler, statements):
+    response = handler.handle_sql_batch({'body': json.dumps({'statements': statements})})
+    return response['statusCode'], json.loads(response['body'])['statements']
+
+
+def test_a_statement_timeout_does_not_leak_to_later_statements(bastion_handler):
+    handler = bastion_handler()
+    status, entries = run_batch(handler, [
+        {'sql': 'SELECT 1', 'statement_timeout_ms': 50},
+        {'sql': 'SELECT pg_sleep(0.2)'},
+    ])
+    assert status == 200
+    assert [entry.get('status') for entry in entries] == [None, None]
+
+
+def test_a_statement_timeout_still_applies_to_its_own_statement(bastion_handler):
+    handler = bastion_handler()
+    status, entries = run_batch(handler, [
+        {'sql': 'SELECT pg_sleep(0.2)', 'statement_timeout_ms': 50},
+        {'sql': 'SELECT 1'},
+    ])
+    assert entries[0]['status'] == 504
+    assert 'status' not in entries[1]
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+SCHEMA = 'talent_lookup_test'
+
+
+def trigram_installed(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regprocedure('word_similarity(text, text)') IS NOT NULL")
+    return cursor.fetchone()[0]
+
+
+def trigram_available(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+@pytest.fixture
+def lookup(conn, bastion_handler):
+    """Run /talent/lookup against a schema of skills, topics and talents."""
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(f"CREATE TABLE {SCHEMA}.skills (id serial PRIMARY KEY, name text NOT NULL)")
+    cursor.execute(f"CREATE TABLE {SCHEMA}.topics (id serial PRIMARY KEY, name text NOT NULL, visible boolean)")
+    cursor.execute(f"CREATE TABLE {SCHEMA}.talents (id serial PRIMARY KEY, name text NOT NULL)")
+    cursor.execute(f"INSERT INTO {SCHEMA}.skills (name) VALUES ('Copywriting'), ('Editing'), ('Photography')")
+    cursor.execute(f"INSERT INTO {SCHEMA}.topics (name, visible) VALUES ('Fintech', true), ('Finance', false)")
+    cursor.execute(f"INSERT INTO {SCHEMA}.talents (name) VALUES ('Ada Lovelace')")
+
+    handler = bastion_handler(f'-c search_path={SCHEMA},public')
+
+    def call(body):
+        response = handler.handle_talent_lookup({'body': json.dumps(body)})
+        return response['statusCode'], json.loads(response['body'])
+
+    yield call
+    handler.connection_manager.close()
+    cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+
+def test_lookup_without_pg_trgm_is_a_503(conn, lookup):
+    if trigram_installed(conn):
+        pytest.skip('word_similarity exists in the test database')
+
+    status, body = lookup({'text': 'need a copywritting expert'})
+
+    assert status == 503
+    assert 'pg_trgm' in body['error']
+
+
+def test_lookup_finds_misspelt_terms(conn, lookup):
+    if not trigram_available(conn):
+        pytest.skip('pg_trgm is not available on the test database server')
+    conn.cursor().execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    status, body = lookup({'text': 'need a copywritting expert for fintec', 'kinds': ['skills', 'topics']})
+
+    assert status == 200
+    assert body['terms'] == ['copywritting', 'expert', 'fintec']
+    found = {(row['term'], row['kind']): row['name'] for row in body['results']}
+    assert found[('copywritting', 'skills')] == 'Copywriting'
+    assert found[('fintec', 'topics')] == 'Fintech'
+    assert not any(row['name'] == 'Finance' for row in body['results'])
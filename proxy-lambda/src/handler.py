@@ -1,85 +1,347 @@
+import base64
 import json
 import os
+import time
 import requests
 import boto3
+from collections import namedtuple
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 
-def get_hash_secret():
-    """Get the hash secret from AWS Secrets Manager."""
-    client = boto3.client('secretsmanager')
+from secret_cache import SecretCache
+from lambda_logging import PayloadLogger, configure_logging
+from compression import accepted_encodings, compress_response, decompress
+from result_cache import ResultCache
+from single_flight import SingleFlight
+from sql_classifier import analyze as analyze_sql, normalize as normalize_sql
+
+# LOG_LEVEL gates everything, including payload dumps
+logger = configure_logging()
+payload_logger = PayloadLogger(logger)
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TalentFinder/Proxy')
+
+# Seconds to wait for the TCP/TLS handshake and for the bastion's answer.
+# The read timeout stays under this function's own 30s timeout so a slow
+# bastion produces an error response rather than a killed invocation.
+BASTION_CONNECT_TIMEOUT = float(os.environ.get('BASTION_CONNECT_TIMEOUT_SECONDS', '3.05'))
+BASTION_READ_TIMEOUT = float(os.environ.get('BASTION_READ_TIMEOUT_SECONDS', '27'))
+
+# Keep-alive connections kept per host; one container serves one request
+# at a time, so a couple is plenty
+BASTION_POOL_SIZE = int(os.environ.get('BASTION_POOL_SIZE', '2'))
+
+def create_bastion_session():
+    """Build a session whose pooled connections survive warm invocations."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=BASTION_POOL_SIZE,
+        max_retries=0
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+bastion_session = create_bastion_session()
+
+# How often a forwarded request found a warm connection to the bastion
+connection_stats = {
+    'requests': 0,
+    'new_connections': 0,
+    'reused_connections': 0,
+}
+
+# Bastion response headers handed back to the caller as-is
+PASSTHROUGH_RESPONSE_HEADERS = ('Content-Type', 'Content-Encoding', 'Server-Timing')
+
+# A bastion answer as received: status, passthrough headers, raw body bytes
+BastionReply = namedtuple('BastionReply', ['status_code', 'headers', 'content'])
+
+# Read-only /sql results are cached for this long by default; requests can
+# ask for a different TTL with `cache_ttl_seconds` (0 to bypass), up to the max
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', '60'))
+RESULT_CACHE_MAX_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_MAX_TTL_SECONDS', '600'))
+
+# Cached bastion responses, shared by every request this container serves
+result_cache = ResultCache(max_bytes=os.environ.get('RESULT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Request fields that don't change the result, so aren't part of the key
+RESULT_CACHE_IGNORED_FIELDS = ('sql', 'cache_ttl_seconds', 'stream')
+
+# When on, identical read requests in flight at the same time share one
+# bastion call. A Lambda container handles one event at a time, so there is
+# nothing to share there; it is off unless the handler is driven by several
+# threads in one process (a local server, a load test).
+COALESCE_READS = os.environ.get('COALESCE_READS', 'false').lower() == 'true'
+in_flight = SingleFlight()
+
+def bastion_connection_count(url):
+    """Return how many connections the session has opened for `url`'s scheme."""
+    pools = bastion_session.get_adapter(url).poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+# Built once per container; boto3 client construction is not free
+_secretsmanager_client = None
+
+def get_secretsmanager_client():
+    global _secretsmanager_client
+    if _secretsmanager_client is None:
+        _secretsmanager_client = boto3.client('secretsmanager')
+    return _secretsmanager_client
+
+def load_hash_secret():
+    """Fetch the hash secret from AWS Secrets Manager."""
+    client = get_secretsmanager_client()
     try:
         response = client.get_secret_value(SecretId='contently/bastion/credentials')
         secret = json.loads(response['SecretString'])
         return secret['hash_secret']
     except Exception as e:
-        print(f"Error getting hash secret: {str(e)}")
+        logger.error("Error getting hash secret: %s", e)
         raise
 
+# Warm containers reuse the secret; a rotation is picked up on expiry or
+# when the bastion rejects the cached value
+hash_secret_cache = SecretCache(
+    load_hash_secret,
+    ttl_seconds=os.environ.get('HASH_SECRET_TTL_SECONDS', '300'),
+    refresh_ahead_seconds=os.environ.get('HASH_SECRET_REFRESH_AHEAD_SECONDS', '60')
+)
+
+def get_hash_secret():
+    """Get the hash secret, from the cache when it is fresh."""
+    return hash_secret_cache.get()
+
 def add_cors_headers(response, origin):
     """Add CORS headers to the response."""
-    response['headers'] = {
+    response.setdefault('headers', {}).update({
         'Access-Control-Allow-Origin': origin if origin else '*',
         'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
         'Access-Control-Allow-Headers': 'Content-Type',
         'Access-Control-Allow-Credentials': 'true'
-    }
+    })
     return response
 
-def forward_to_bastion(path, body):
-    """Forward request to bastion lambda using function URL."""
+def result_cache_key(path, body):
+    """Return (key, ttl_seconds) for a read request, or (None, 0).
+
+    Only /sql requests the classifier marks as read-only get a key. The key
+    is the normalized SQL plus every other field that shapes the result
+    (params, format, limits), so equivalent requests share it. A ttl of 0
+    means the result may be shared with concurrent callers but not cached.
+    """
+    if path != 'sql':
+        return None, 0
+    try:
+        request = json.loads(body)
+    except ValueError:
+        return None, 0
+    if not isinstance(request, dict) or not isinstance(request.get('sql'), str):
+        return None, 0
+    
+    ttl = request.get('cache_ttl_seconds', RESULT_CACHE_TTL_SECONDS)
+    if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl < 0:
+        ttl = 0
+    if not analyze_sql(request['sql']).read_only:
+        return None, 0
+    
+    options = {k: v for k, v in request.items() if k not in RESULT_CACHE_IGNORED_FIELDS}
+    key = normalize_sql(request['sql']) + '\n' + json.dumps(options, sort_keys=True, separators=(',', ':'))
+    return key, max(0, min(ttl, RESULT_CACHE_MAX_TTL_SECONDS))
+
+def call_bastion(path, body, content_type='application/json', accept_encoding=None):
+    """Forward request to bastion lambda using function URL.
+
+    `body` is the raw request bytes. They are sent as-is and the bastion's
+    response body comes back unparsed, so nothing is decoded or re-encoded
+    on the way through. The caller's Accept-Encoding is passed along, so a
+    body the bastion compressed stays compressed. If the bastion rejects
+    the cached secret the call is retried once with a fresh one.
+
+    Returns a BastionReply.
+    """
     bastion_url = os.environ['BASTION_FUNCTION_URL'].rstrip('/')
     
-    # Ensure URL has https:// prefix
-    if not bastion_url.startswith('https://'):
+    # Ensure URL has https:// prefix (plain http is left alone for local runs)
+    if not bastion_url.startswith(('https://', 'http://')):
         bastion_url = f'https://{bastion_url}'
     
-    # Get hash secret for authentication
+    # Log request details (mask the hash secret)
+    url = f"{bastion_url}/{path.lstrip('/')}"
+    logger.info("Making request to bastion: %s", url)
+    logger.debug("Request headers: {'Content-Type': '%s', 'x-api-key': '***'}", content_type)
+    payload_logger.payload("Request body", body)
+    
     hash_secret = get_hash_secret()
+    response, content = post_to_bastion(url, hash_secret, body, content_type, accept_encoding)
     
+    # The secret may have been rotated since we cached it; refresh it once
+    # and retry, but only if Secrets Manager hands back something new
+    if response.status_code in (401, 403):
+        logger.warning("Bastion rejected the cached hash secret (%s), refreshing it", response.status_code)
+        hash_secret_cache.invalidate()
+        fresh_secret = get_hash_secret()
+        if fresh_secret != hash_secret:
+            response, content = post_to_bastion(url, fresh_secret, body, content_type, accept_encoding)
+    
+    # Log response details
+    logger.info("Bastion response status: %s", response.status_code)
+    logger.debug("Bastion response headers: %s", response.headers)
+    
+    headers = {
+        name: response.headers[name]
+        for name in PASSTHROUGH_RESPONSE_HEADERS
+        if name in response.headers
+    }
+    return BastionReply(response.status_code, headers, content)
+
+def build_response(reply, accept_encoding=None):
+    """Turn a BastionReply into the Lambda response for this caller."""
+    headers = {name: value for name, value in reply.headers.items() if name != 'Content-Encoding'}
+    content = reply.content
+    
+    # A compressed body the caller can take goes back byte for byte;
+    # otherwise it is inflated here (the bastion only compresses with
+    # codings the caller offered, so that is the unusual case)
+    coding = reply.headers.get('Content-Encoding', 'identity').lower()
+    if coding != 'identity':
+        logger.debug("Bastion response body: %s bytes, %s", len(content), coding)
+        if accepted_encodings(accept_encoding).get(coding, 0) > 0:
+            headers['Content-Encoding'] = coding
+            headers['Vary'] = 'Accept-Encoding'
+            return {
+                'statusCode': reply.status_code,
+                'headers': headers,
+                'body': base64.b64encode(content).decode('ascii'),
+                'isBase64Encoded': True
+            }
+        content = decompress(content, coding)
+    payload_logger.payload("Bastion response body", content)
+    
+    # Text bodies go back as they are; anything else has to be base64 for
+    # API Gateway. Decoding with the declared charset skips requests'
+    # charset sniffing of response.text.
+    try:
+        body = content.decode(get_encoding_from_headers(CaseInsensitiveDict(reply.headers)) or 'utf-8')
+        is_base64 = False
+    except (UnicodeDecodeError, LookupError):
+        body = base64.b64encode(content).decode('ascii')
+        is_base64 = True
+    
+    # Compress it ourselves if the bastion didn't and the caller accepts it
+    return compress_response({
+        'statusCode': reply.status_code,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': is_base64
+    }, accept_encoding)
+
+def post_to_bastion(url, hash_secret, body, content_type='application/json', accept_encoding=None):
+    """POST raw `body` bytes to the bastion over the warm session, authenticated with `hash_secret`.
+
+    Returns the response and its body bytes exactly as sent, without
+    requests' automatic decompression.
+    """
     # Prepare headers with hash secret
     headers = {
-        'Content-Type': 'application/json',
+        'Content-Type': content_type,
+        'Accept-Encoding': accept_encoding or 'identity',
         'x-api-key': hash_secret
     }
     
-    # Log request details (mask the hash secret)
-    url = f"{bastion_url}/{path.lstrip('/')}"
-    print(f"Making request to bastion: {url}")
-    print(f"Request headers: {{'Content-Type': 'application/json', 'x-api-key': '***'}}")
-    print(f"Request body: {json.dumps(body, indent=2)}")
-    
-    # Make request to bastion function URL
-    response = requests.post(
+    # Make request to bastion function URL over the warm session
+    opened_before = bastion_connection_count(url)
+    response = bastion_session.post(
         url,
         headers=headers,
-        json=body
+        data=body,
+        timeout=(BASTION_CONNECT_TIMEOUT, BASTION_READ_TIMEOUT),
+        stream=True
     )
-    
-    # Log response details
-    print(f"Bastion response status: {response.status_code}")
-    print(f"Bastion response headers: {dict(response.headers)}")
-    print(f"Bastion response body: {response.text}")
-    
-    # Parse response
     try:
-        response_body = response.json()
-    except:
-        response_body = response.text
-    
-    return {
-        'statusCode': response.status_code,
-        'body': json.dumps(response_body) if isinstance(response_body, (dict, list)) else response_body
-    }
+        content = response.raw.read(decode_content=False)
+    finally:
+        response.close()
+    connection_stats['requests'] += 1
+    if bastion_connection_count(url) > opened_before:
+        connection_stats['new_connections'] += 1
+    else:
+        connection_stats['reused_connections'] += 1
+    logger.info("Bastion connection stats: %s", connection_stats)
+    return response, content
+
+def get_header(event, name):
+    """Look up a request header; HTTP API lowercases names, but be lenient."""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def get_raw_body(event):
+    """Return the request body as bytes, undoing API Gateway's base64 if applied."""
+    body = event.get('body')
+    if not body:
+        return b'{}'
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    return body.encode('utf-8')
 
 def handler(event, context):
     """Handle incoming requests and forward them to the bastion lambda."""
-    print("Received event:", json.dumps(event, indent=2))
+    started_at = time.monotonic()
+    payload_logger.begin_invocation()
+    reused_before = connection_stats['reused_connections']
+    cache_hits_before = result_cache.counters['hits']
+    
+    response = handle_request(event)
+    
+    emit_metrics(event, response, {
+        'total_ms': round((time.monotonic() - started_at) * 1000, 2),
+        'bastion_connection_reused': connection_stats['reused_connections'] - reused_before,
+        'result_cache_hit': result_cache.counters['hits'] - cache_hits_before,
+    })
+    return response
+
+def emit_metrics(event, response, values):
+    """Write one CloudWatch Embedded Metric Format line for this invocation."""
+    logging_stats = payload_logger.stats()
+    values = dict(values, logging_cpu_ms=logging_stats['logging_cpu_ms'],
+                  logging_truncated=logging_stats['logging_truncated'])
+    units = {
+        'total_ms': 'Milliseconds',
+        'logging_cpu_ms': 'Milliseconds',
+        'logging_truncated': 'Count',
+        'bastion_connection_reused': 'Count',
+        'result_cache_hit': 'Count',
+    }
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Route']],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'None')} for name in values],
+            }],
+        },
+        'Route': '/' + event.get('rawPath', '').lstrip('/'),
+        'StatusCode': response.get('statusCode'),
+        'LoggingSampled': logging_stats['logging_sampled'],
+    }
+    record.update(values)
+    print(json.dumps(record), flush=True)
+
+def handle_request(event):
+    # The body is logged (abridged) once we have its bytes, not here
+    payload_logger.payload("Received event", {k: v for k, v in event.items() if k != 'body'})
     
     # Get request details
     path = event.get('rawPath', '').lstrip('/')  
     origin = event.get('headers', {}).get('origin', '')
     method = event.get('requestContext', {}).get('http', {}).get('method', '')
     
-    print(f"Request details - Origin: {origin}, Method: {method}, Path: {path}")
+    logger.info("Request details - Origin: %s, Method: %s, Path: %s", origin, method, path)
     
     # Handle OPTIONS request for CORS
     if method == 'OPTIONS':
@@ -88,17 +350,45 @@ def handler(event, context):
             'body': ''
         }, origin)
     
-    # Get request body
-    body = json.loads(event.get('body', '{}')) if event.get('body') else {}
-    print(f"Request body: {json.dumps(body, indent=2)}")
+    # Get the raw request body; the bastion validates it, so the proxy
+    # only parses it to decide whether the result can be cached
+    body = get_raw_body(event)
+    content_type = get_header(event, 'content-type') or 'application/json'
+    accept_encoding = get_header(event, 'accept-encoding')
+    cache_key, cache_ttl = result_cache_key(path, body)
     
-    # Forward request to bastion
+    # Forward request to bastion, unless an identical read is cached
     try:
-        response = forward_to_bastion(path, body)
-        print(f"Bastion response: {response.get('statusCode', 500)} - {response.get('body', '')}")
+        def fetch():
+            return call_bastion(path, body, content_type, accept_encoding)
+        
+        reply = result_cache.get(cache_key) if cache_key and cache_ttl > 0 else None
+        if reply is not None:
+            cache_status = 'HIT'
+        elif cache_key:
+            # Identical reads already in flight share that call's reply
+            reply, shared = in_flight.do(cache_key, fetch) if COALESCE_READS else (fetch(), False)
+            cache_status = 'COALESCED' if shared else ('MISS' if cache_ttl > 0 else 'BYPASS')
+            if not shared and cache_ttl > 0 and reply.status_code == 200:
+                result_cache.put(cache_key, reply, len(reply.content), cache_ttl)
+        else:
+            reply = fetch()
+            cache_status = 'BYPASS'
+        logger.info("Result cache %s: %s", cache_status, result_cache.stats())
+        
+        response = build_response(reply, accept_encoding)
+        response['headers']['X-Cache'] = cache_status
+        logger.info("Bastion response: %s", response.get('statusCode', 500))
         return add_cors_headers(response, origin)
+    except requests.Timeout as e:
+        logger.error("Bastion request timed out: %s", e)
+        error_response = {
+            'statusCode': 504,
+            'body': json.dumps({'error': f'Bastion request timed out: {str(e)}'})
+        }
+        return add_cors_headers(error_response, origin)
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         error_response = {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
@@ -0,0 +1,89 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """LRU of bastion responses, bounded by total size, with per-entry TTLs.
+
+    Lives for as long as the warm container does. Values are opaque to the
+    cache apart from their size in bytes, which `put` is told. Entries larger
+    than `max_entry_bytes` are never stored, so one huge result can't flush
+    everything else.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entry_bytes=None):
+        self.max_bytes = int(max_bytes)
+        self.max_entry_bytes = int(max_entry_bytes) if max_entry_bytes is not None else self.max_bytes // 4
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'expirations': 0,
+            'evictions': 0,
+            'oversized': 0,
+        }
+
+    def get(self, key):
+        """Return the cached value for `key`, or None if missing or expired."""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters['misses'] += 1
+            return None
+
+        value, size, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.counters['expirations'] += 1
+            self.counters['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.counters['hits'] += 1
+        return value
+
+    def put(self, key, value, size, ttl_seconds):
+        """Store `value` for `ttl_seconds`, evicting least recently used entries to fit."""
+        with self._lock:
+            self._put(key, value, size, ttl_seconds)
+
+    def _put(self, key, value, size, ttl_seconds):
+        if ttl_seconds <= 0:
+            return
+        if size > self.max_entry_bytes:
+            self.counters['oversized'] += 1
+            logger.debug("Not caching %s byte result (limit %s)", size, self.max_entry_bytes)
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and self._bytes + size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.counters['evictions'] += 1
+
+        self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+        self._bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), bytes=self._bytes)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,21 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC)
+
+
+@pytest.fixture
+def proxy_handler():
+    """A fresh copy of the proxy's handler module.
+
+    Loaded by path under its own name, as the bastion's handler is also
+    called `handler`, and reloaded per test so caches and counters start empty.
+    """
+    spec = importlib.util.spec_from_file_location('proxy_handler', os.path.join(SRC, 'handler.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
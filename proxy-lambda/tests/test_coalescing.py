@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+CALLERS = 8
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out waiting for the callers to line up')
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_for_one_key_run_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'reply'
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(flight.do, 'key', fetch) for _ in range(CALLERS)]
+        wait_for(lambda: flight.counters['coalesced'] == CALLERS - 1)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * (CALLERS - 1)
+    assert {result for result, _ in results} == {'reply'}
+    assert flight.stats() == {'calls': 1, 'coalesced': CALLERS - 1, 'in_flight': 0}
+
+
+def test_waiting_callers_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError('bastion down')
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(flight.do, 'key', fetch) for _ in range(CALLERS)]
+        wait_for(lambda: flight.counters['coalesced'] == CALLERS - 1)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match='bastion down'):
+                future.result()
+
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_nothing_is_remembered_after_the_call():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)
+
+
+def read_event(sql):
+    body = json.dumps({'sql': sql, 'cache_ttl_seconds': 0})
+    return {
+        'rawPath': '/sql',
+        'headers': {'content-type': 'application/json'},
+        'requestContext': {'http': {'method': 'POST'}},
+        'body': body,
+    }
+
+
+def serve_concurrently(proxy_handler, monkeypatch, coalesce):
+    monkeypatch.setattr(proxy_handler, 'COALESCE_READS', coalesce)
+    release = threading.Event()
+    upstream_calls = []
+
+    def call_bastion(path, body, content_type='application/json', accept_encoding=None):
+        upstream_calls.append(body)
+        release.wait(5)
+        return proxy_handler.BastionReply(200, {'Content-Type': 'application/json'}, b'{"results": []}')
+
+    monkeypatch.setattr(proxy_handler, 'call_bastion', call_bastion)
+    event = read_event('SELECT id, name FROM skills ORDER BY name')
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(proxy_handler.handle_request, event) for _ in range(CALLERS)]
+        if coalesce:
+            wait_for(lambda: proxy_handler.in_flight.counters['coalesced'] == CALLERS - 1)
+        else:
+            wait_for(lambda: len(upstream_calls) == CALLERS)
+        release.set()
+        responses = [future.result() for future in futures]
+    return upstream_calls, responses
+
+
+def test_concurrent_identical_reads_make_one_upstream_call(proxy_handler, monkeypatch):
+    upstream_calls, responses = serve_concurrently(proxy_handler, monkeypatch, coalesce=True)
+
+    assert len(upstream_calls) == 1
+    assert all(response['statusCode'] == 200 for response in responses)
+    assert sorted(response['headers']['X-Cache'] for response in responses) == \
+        ['BYPASS'] + ['COALESCED'] * (CALLERS - 1)
+
+
+def test_reads_are_not_coalesced_by_default(proxy_handler, monkeypatch):
+    assert proxy_handler.COALESCE_READS is False
+    upstream_calls, responses = serve_concurrently(proxy_handler, monkeypatch, coalesce=False)
+
+    assert len(upstream_calls) == CALLERS
+    assert {response['headers']['X-Cache'] for response in responses} == {'BYPASS'}
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = ResultCache(max_bytes=100)
+    cache.put('a', 'reply', 10, ttl_seconds=5)
+
+    clock[0] += 4.9
+    assert cache.get('a') == 'reply'
+    clock[0] += 0.1
+    assert cache.get('a') is None
+    assert cache.stats() == dict(hits=1, misses=1, expirations=1, evictions=0, oversized=0, entries=0, bytes=0)
+
+
+def test_zero_ttl_is_not_stored(clock):
+    cache = ResultCache(max_bytes=100)
+    cache.put('a', 'reply', 10, ttl_seconds=0)
+    assert cache.get('a') is None
+
+
+def test_least_recently_used_entries_are_evicted_to_fit(clock):
+    cache = ResultCache(max_bytes=30, max_entry_bytes=30)
+    cache.put('a', 'A', 10, 60)
+    cache.put('b', 'B', 10, 60)
+    cache.put('c', 'C', 10, 60)
+    assert cache.get('a') == 'A'
+
+    cache.put('d', 'D', 15, 60)
+
+    assert cache.get('b') is None
+    assert cache.get('c') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('d') == 'D'
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['bytes'] == 25
+
+
+def test_replacing_a_key_does_not_count_it_twice(clock):
+    cache = ResultCache(max_bytes=100, max_entry_bytes=100)
+    cache.put('a', 'old', 40, 60)
+    cache.put('a', 'new', 30, 60)
+    assert cache.get('a') == 'new'
+    assert cache.stats()['bytes'] == 30
+
+
+def test_oversized_entries_are_never_stored(clock):
+    cache = ResultCache(max_bytes=100)
+    cache.put('small', 'S', 10, 60)
+    cache.put('huge', 'H', 26, 60)
+
+    assert cache.get('huge') is None
+    assert cache.get('small') == 'S'
+    assert cache.stats()['oversized'] == 1
+
+
+def request_body(**fields):
+    return json.dumps(dict({'sql': 'SELECT id FROM talents'}, **fields)).encode()
+
+
+def test_equivalent_reads_share_a_key(proxy_handler):
+    key, ttl = proxy_handler.result_cache_key('sql', request_body(sql='SELECT id FROM talents'))
+    same, _ = proxy_handler.result_cache_key('sql', request_body(sql='select   id\nfrom talents', cache_ttl_seconds=5))
+
+    assert key == same
+    assert ttl == proxy_handler.RESULT_CACHE_TTL_SECONDS
+
+
+@pytest.mark.parametrize('fields', [
+    {'params': [1]},
+    {'format': 'columnar'},
+    {'max_rows': 10},
+    {'sql': 'SELECT name FROM talents'},
+])
+def test_fields_that_shape_the_result_are_part_of_the_key(proxy_handler, fields):
+    key, _ = proxy_handler.result_cache_key('sql', request_body())
+    other, _ = proxy_handler.result_cache_key('sql', request_body(**fields))
+    assert other != key
+
+
+@pytest.mark.parametrize('path, body', [
+    ('sql', request_body(sql='DELETE FROM talents')),
+    ('sql', request_body(sql='WITH gone AS (DELETE FROM talents RETURNING id) SELECT * FROM gone')),
+    ('sql', b'not json'),
+    ('sql', b'[]'),
+    ('sql/batch', request_body()),
+])
+def test_writes_and_other_requests_get_no_key(proxy_handler, path, body):
+    assert proxy_handler.result_cache_key(path, body) == (None, 0)
+
+
+@pytest.mark.parametrize('requested, expected', [
+    (0, 0),
+    (-1, 0),
+    ('60', 0),
+    (True, 0),
+    (30, 30),
+    (10 ** 6, 600),
+])
+def test_requested_ttls_are_bounded(proxy_handler, requested, expected):
+    _, ttl = proxy_handler.result_cache_key('sql', request_body(cache_ttl_seconds=requested))
+    assert ttl == expected
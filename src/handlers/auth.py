@@ -1,10 +1,23 @@
 import json
-import requests
 import os
 import re
 
+from contently_client import ContentlyClient
+from token_cache import TokenCache
+
 CONTENTLY_URL = os.environ.get('CONTENTLY_URL', 'https://qa3.contently.xyz')
 
+# Shared by every sign-in this container serves, so logins reuse the
+# connection to Contently instead of paying a fresh TLS handshake
+contently_client = ContentlyClient(CONTENTLY_URL)
+
+# Tokens handed out recently, so a repeat sign-in (another tab, a reload)
+# doesn't go back to Contently
+token_cache = TokenCache()
+
+# Contently's answers to credentials it won't accept (invalid_grant, locked)
+CREDENTIALS_REJECTED_STATUSES = (400, 401, 403)
+
 def add_cors_headers(response, origin):
     print(f"Adding CORS headers for origin: {origin}")
     headers = {
@@ -72,11 +85,15 @@ def handler(event, context):
                     origin
                 )
             
+            cached_token = token_cache.get(email, password)
+            if cached_token is not None:
+                print(f"Serving cached token, expires in {cached_token['expires_in']}s")
+                return add_cors_headers(create_response(200, cached_token), origin)
+
             # Forward the request to Contently's OAuth endpoint
-            contently_url = f"{CONTENTLY_URL}/oauth/token"
-            print(f"Making request to Contently: {contently_url}")
-            response = requests.post(
-                contently_url,
+            print(f"Making request to Contently: {CONTENTLY_URL}/oauth/token")
+            response = contently_client.post(
+                '/oauth/token',
                 json={
                     "grant_type": "password",
                     "username": email,
@@ -90,6 +107,11 @@ def handler(event, context):
             print(f"Contently response body: {response.text}")
             
             if response.status_code >= 400:
+                if response.status_code in CREDENTIALS_REJECTED_STATUSES:
+                    # The password changed or the account was locked, so
+                    # tokens cached under the old credentials are stale too
+                    evicted = token_cache.invalidate_user(email)
+                    print(f"Sign-in rejected, cached tokens removed: {evicted}")
                 error_message = "Authentication failed"
                 try:
                     error_data = response.json()
@@ -105,21 +127,20 @@ def handler(event, context):
             # Extract the token from the response
             try:
                 token_data = response.json()
-                return add_cors_headers(
-                    create_response(200, {
-                        'access_token': token_data['access_token'],
-                        'token_type': token_data['token_type'],
-                        'expires_in': token_data['expires_in']
-                    }),
-                    origin
-                )
+                token = {
+                    'access_token': token_data['access_token'],
+                    'token_type': token_data['token_type'],
+                    'expires_in': token_data['expires_in']
+                }
+                token_cache.put(email, password, token)
+                return add_cors_headers(create_response(200, token), origin)
             except Exception as e:
                 print(f"Error parsing token response: {str(e)}")
                 return add_cors_headers(
                     create_response(500, {'error': 'Failed to parse authentication response'}),
                     origin
                 )
-            
+
     except Exception as e:
         print(f"Error: {str(e)}")
         return add_cors_headers(
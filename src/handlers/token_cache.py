@@ -0,0 +1,112 @@
+import os
+import hmac
+import time
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+# Upper bound on how long a token is served from cache, whatever Contently's
+# expires_in says. Nothing tells this cache when a token is revoked, so this
+# is also how long a revoked token can still be handed out.
+TOKEN_CACHE_MAX_AGE_SECONDS = int(os.environ.get('TOKEN_CACHE_MAX_AGE_SECONDS', '60'))
+
+# Stop handing a token out this long before it really expires, so clients
+# never receive one that dies in flight
+TOKEN_CACHE_EXPIRY_MARGIN_SECONDS = int(os.environ.get('TOKEN_CACHE_EXPIRY_MARGIN_SECONDS', '30'))
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', '1000'))
+
+
+class TokenCache:
+    """Per-container cache of OAuth tokens, keyed by a salted hash of the credentials.
+
+    Credentials are never stored: entries are found by an HMAC-SHA256 of
+    email and password under a salt that is random per container, so the
+    keys are useless outside this process. A wrong password simply misses;
+    once Contently rejects one, every entry for that email is dropped, since
+    a changed password or a locked account makes them stale.
+
+    Each entry remembers when the upstream token expires and is dropped
+    `expiry_margin` seconds before that, or after `max_age` seconds,
+    whichever comes first.
+    """
+
+    def __init__(self, max_age=TOKEN_CACHE_MAX_AGE_SECONDS, expiry_margin=TOKEN_CACHE_EXPIRY_MARGIN_SECONDS,
+                 max_entries=TOKEN_CACHE_MAX_ENTRIES):
+        self.max_age = max_age
+        self.expiry_margin = expiry_margin
+        self.max_entries = max_entries
+        self._salt = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+        }
+
+    def credentials_key(self, email, password):
+        message = email.encode('utf-8') + b'\0' + password.encode('utf-8')
+        return hmac.new(self._salt, message, hashlib.sha256).digest()
+
+    def user_key(self, email):
+        return hmac.new(self._salt, email.encode('utf-8'), hashlib.sha256).digest()
+
+    def get(self, email, password):
+        """Return a copy of the cached token response with `expires_in` counted down, or None."""
+        key = self.credentials_key(email, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is None or now >= entry['serve_until']:
+                if entry is not None:
+                    self._remove(key)
+                self.counters['misses'] += 1
+                return None
+            self.counters['hits'] += 1
+            return dict(entry['token'], expires_in=int(entry['expires_at'] - now))
+
+    def put(self, email, password, token):
+        """Remember a successful token response (access_token, token_type, expires_in)."""
+        expires_in = int(token.get('expires_in') or 0)
+        lifetime = min(self.max_age, expires_in - self.expiry_margin)
+        if lifetime <= 0:
+            return
+
+        key = self.credentials_key(email, password)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            user = self.user_key(email)
+            self._entries[key] = {
+                'token': dict(token),
+                'user': user,
+                'expires_at': now + expires_in,
+                'serve_until': now + lifetime,
+            }
+            self._keys_by_user.setdefault(user, set()).add(key)
+
+    def invalidate_user(self, email):
+        """Forget every entry for `email`, e.g. after Contently rejected a sign-in. Returns how many."""
+        with self._lock:
+            keys = list(self._keys_by_user.get(self.user_key(email), ()))
+            for key in keys:
+                self._remove(key)
+            self.counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        keys = self._keys_by_user[entry['user']]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_user[entry['user']]
@@ -0,0 +1,27 @@
+import importlib.util
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The Lambdas each ship their own copy of these modules
+LAMBDA_SOURCES = ('bastion-lambda/src', 'proxy-lambda/src')
+
+
+def load_module(path, name):
+    """Import the file at `path` (relative to the repo root) as module `name`."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(params=LAMBDA_SOURCES)
+def sql_classifier(request):
+    return load_module(f'{request.param}/sql_classifier.py', f"sql_classifier_{request.param.split('-')[0]}")
+
+
+@pytest.fixture
+def token_cache():
+    return load_module('src/handlers/token_cache.py', 'token_cache')
@@ -0,0 +1,38 @@
+import filecmp
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules each Lambda ships a copy of: name -> the directories holding one.
+# A fix to one copy has to be made to all of them.
+SHARED_MODULES = {
+    'compression.py': ('bastion-lambda/src', 'proxy-lambda/src'),
+    'contently_client.py': ('bastion-lambda/src', 'src/handlers'),
+    'lambda_logging.py': ('bastion-lambda/src', 'proxy-lambda/src'),
+    'secret_cache.py': ('bastion-lambda/src', 'proxy-lambda/src'),
+    'sql_classifier.py': ('bastion-lambda/src', 'proxy-lambda/src'),
+}
+
+
+@pytest.mark.parametrize('module', sorted(SHARED_MODULES))
+def test_copies_are_identical(module):
+    first, *others = (os.path.join(ROOT, directory, module) for directory in SHARED_MODULES[module])
+    for other in others:
+        assert filecmp.cmp(first, other, shallow=False), f'{other} differs from {first}'
+
+
+# The bastion is deployed from package/ (CodeUri in its template.yaml), which
+# deploy.sh fills with the src/ modules next to the vendored dependencies
+BASTION_SOURCE = 'bastion-lambda/src'
+BASTION_PACKAGE = 'bastion-lambda/package'
+
+
+@pytest.mark.parametrize('module', sorted(
+    name for name in os.listdir(os.path.join(ROOT, BASTION_SOURCE)) if name.endswith('.py')))
+def test_deployed_bastion_matches_src(module):
+    deployed = os.path.join(ROOT, BASTION_PACKAGE, module)
+    assert os.path.exists(deployed), f'{module} is missing from {BASTION_PACKAGE}, run deploy.sh or copy it'
+    assert filecmp.cmp(os.path.join(ROOT, BASTION_SOURCE, module), deployed, shallow=False), \
+        f'{deployed} differs from {BASTION_SOURCE}/{module}'
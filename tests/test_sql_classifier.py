@@ -0,0 +1,76 @@
+import pytest
+
+READS = [
+    'SELECT * FROM talents',
+    'select id from talents where name = $1',
+    '(SELECT 1) UNION (SELECT 2)',
+    'WITH recent AS (SELECT * FROM clips) SELECT * FROM recent',
+    'VALUES (1, 2)',
+    'TABLE talents',
+    'SELECT 1; SELECT 2',
+    'SELECT 1;',
+    "SELECT 'DELETE FROM talents'",
+    "SELECT E'it\\'s; DROP TABLE talents'",
+    'SELECT "update" FROM t',
+    'SELECT 1 -- DELETE FROM talents',
+    '-- DELETE FROM talents\nSELECT 1',
+    'SELECT /* DROP TABLE talents */ 1',
+    'SELECT /* nested /* DROP */ still comment */ 1',
+    'SELECT $$DELETE FROM talents$$',
+    'SELECT $body$ DROP TABLE t; $body$',
+    'SELECT replace(name, $1, $2) FROM talents',
+    'SELECT t.update FROM t',
+]
+
+WRITES = [
+    ('DELETE FROM talents', "starts with 'delete'"),
+    ('UPDATE talents SET name = $1', "starts with 'update'"),
+    ('INSERT INTO talents (name) VALUES ($1)', "starts with 'insert'"),
+    ('WITH gone AS (DELETE FROM talents RETURNING id) SELECT * FROM gone', "contains keyword 'delete'"),
+    ('WITH x AS (INSERT INTO t VALUES (1) RETURNING *) SELECT 1', "contains keyword 'insert'"),
+    ('SELECT * INTO backup FROM talents', "contains keyword 'into'"),
+    ('COPY talents TO STDOUT', "starts with 'copy'"),
+    ('SELECT 1 FROM t FOR UPDATE', "contains keyword 'update'"),
+    ('SELECT 1; DELETE FROM talents', "starts with 'delete'"),
+    ('SELECT 1; -- harmless\nDROP TABLE talents', "starts with 'drop'"),
+    ("SELECT $$ ok $$; TRUNCATE talents", "starts with 'truncate'"),
+    ('SELECT 1 FROM t; LOCK TABLE t', "starts with 'lock'"),
+    ('', 'empty statement'),
+    ('-- only a comment', 'empty statement'),
+    ('EXPLAIN ANALYZE DELETE FROM talents', "starts with 'explain'"),
+    ('SET ROLE admin', "starts with 'set'"),
+]
+
+
+@pytest.mark.parametrize('sql', READS)
+def test_reads(sql_classifier, sql):
+    analysis = sql_classifier.analyze(sql)
+    assert analysis.read_only, analysis.reason
+    assert analysis.reason is None
+
+
+@pytest.mark.parametrize('sql,reason', WRITES)
+def test_writes(sql_classifier, sql, reason):
+    analysis = sql_classifier.analyze(sql)
+    assert not analysis.read_only
+    assert analysis.reason == reason
+
+
+def test_unterminated_dollar_quote_swallows_the_rest(sql_classifier):
+    # Postgres would reject this too; nothing after the tag is read as SQL
+    assert sql_classifier.analyze('SELECT $tag$ unterminated; DROP TABLE t').read_only
+
+
+def test_statement_count(sql_classifier):
+    assert sql_classifier.analyze('SELECT 1; SELECT 2;').statement_count == 2
+    assert sql_classifier.analyze("SELECT ';'").statement_count == 1
+
+
+def test_fingerprint_ignores_layout_and_literals(sql_classifier):
+    a = sql_classifier.analyze("SELECT *\n  FROM talents WHERE id = 1 AND name = 'x' -- note")
+    b = sql_classifier.analyze("select * from talents where id = 42 and name = 'y'")
+    assert a.fingerprint == b.fingerprint == 'select * from talents where id = ? and name = ?'
+
+
+def test_normalize_keeps_literals(sql_classifier):
+    assert sql_classifier.normalize("SELECT  'A'  /* c */ ,1") == "select 'A' , 1"
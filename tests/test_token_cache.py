@@ -0,0 +1,36 @@
+TOKEN = {'access_token': 'abc', 'token_type': 'Bearer', 'expires_in': 7200}
+
+
+def test_repeat_sign_in_is_served_from_cache(token_cache):
+    cache = token_cache.TokenCache(max_age=60, expiry_margin=30)
+    cache.put('ann@example.com', 'pw', TOKEN)
+
+    assert cache.get('ann@example.com', 'pw')['access_token'] == 'abc'
+    assert cache.get('ann@example.com', 'wrong') is None
+
+
+def test_rejected_sign_in_drops_every_entry_for_the_user(token_cache):
+    cache = token_cache.TokenCache(max_age=60, expiry_margin=30)
+    cache.put('ann@example.com', 'old', TOKEN)
+    cache.put('ann@example.com', 'older', dict(TOKEN, access_token='def'))
+    cache.put('bob@example.com', 'pw', dict(TOKEN, access_token='ghi'))
+
+    assert cache.invalidate_user('ann@example.com') == 2
+    assert cache.get('ann@example.com', 'old') is None
+    assert cache.get('ann@example.com', 'older') is None
+    assert cache.get('bob@example.com', 'pw')['access_token'] == 'ghi'
+    assert cache.invalidate_user('ann@example.com') == 0
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_tokens_stop_being_served_after_max_age(token_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token_cache.time, 'monotonic', lambda: now[0])
+    cache = token_cache.TokenCache(max_age=60, expiry_margin=30)
+    cache.put('ann@example.com', 'pw', TOKEN)
+
+    now[0] += 59
+    assert cache.get('ann@example.com', 'pw')['expires_in'] == 7200 - 59
+    now[0] += 1
+    assert cache.get('ann@example.com', 'pw') is None
+    assert cache.stats()['entries'] == 0